@@ -0,0 +1,227 @@
+# Worker/src/consumers/batch_content_requested.py
+# Micro-batching consumer for content.requested (bulk re-generation / backfills).
+# Synchronous pull instead of streaming: messages are accumulated for up to
+# BATCH_WINDOW_MS (or until BATCH_SIZE), handled together by handle_batch — one product
+# get_all, one copy call per model, batched Firestore commits — and settled with one
+# acknowledge call (successes + permanent failures) and one modify_ack_deadline(0) call
+# (transient failures, redelivered). Same error policy as pull_content_requested; events
+# already processed (utils/idempotency.py) are acked without work.
+#   BATCH_SIZE                 max messages per batch            (default 200)
+#   BATCH_WINDOW_MS            max wait to fill a batch          (default 500)
+#   BATCH_ACK_DEADLINE_SECONDS lease taken on a batch before work (default 300)
+#   DRAIN_GRACE_SECONDS        on SIGTERM, time a running batch gets to finish (default 8)
+# On SIGTERM a batch still being collected is nacked at once; a batch being processed is
+# re-leased for the grace period and awaited, and if it doesn't finish in time its
+# idempotency claims are released and it is nacked.
+#
+# Meant for the bulk lane: point PUBSUB_SUBSCRIPTION at the priority-filtered bulk
+# subscription (see pull_content_requested.py) so backfills never hold interactive requests.
+#
+#   python -m src.consumers.batch_content_requested
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import signal
+import threading
+from typing import List, Set
+
+from google.cloud import pubsub_v1
+from google.api_core.exceptions import ServiceUnavailable, DeadlineExceeded
+
+from ..handlers.handle_content_requested import handle_batch
+from ..utils import codec, idempotency
+from .flow_control import DRAIN_GRACE
+
+PROJECT = os.getenv("GCP_PROJECT")
+SUBSCRIPTION = os.getenv("PUBSUB_SUBSCRIPTION", "content.requested-pull")
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "200"))
+BATCH_WINDOW = int(os.getenv("BATCH_WINDOW_MS", "500")) / 1000.0
+ACK_DEADLINE = int(os.getenv("BATCH_ACK_DEADLINE_SECONDS", "300"))
+MAX_PER_PULL = 1000          # server-side cap per pull request
+ACK_CHUNK = 2500             # ack_ids per acknowledge / modify_ack_deadline request
+
+_running = True
+
+
+def _transient(exc: Exception) -> bool:
+    return isinstance(exc, (ServiceUnavailable, DeadlineExceeded, ConnectionError))
+
+
+def _collect(subscriber: pubsub_v1.SubscriberClient, path: str) -> List:
+    """Pull until BATCH_SIZE messages or BATCH_WINDOW has passed since the first one."""
+    received: List = []
+    deadline = None
+    while _running and len(received) < BATCH_SIZE:
+        timeout = 30.0 if deadline is None else max(0.05, deadline - time.monotonic())
+        try:
+            resp = subscriber.pull(
+                subscription=path,
+                max_messages=min(MAX_PER_PULL, BATCH_SIZE - len(received)),
+                timeout=timeout,
+            )
+        except DeadlineExceeded:
+            resp = None
+        if resp and resp.received_messages:
+            received.extend(resp.received_messages)
+            if deadline is None:
+                deadline = time.monotonic() + BATCH_WINDOW
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+    return received
+
+
+def _chunks(ids: List[str]):
+    for i in range(0, len(ids), ACK_CHUNK):
+        yield ids[i:i + ACK_CHUNK]
+
+
+def _nack(subscriber: pubsub_v1.SubscriberClient, path: str, ack_ids: List[str]) -> None:
+    for chunk in _chunks(ack_ids):
+        try:
+            subscriber.modify_ack_deadline(subscription=path, ack_ids=chunk, ack_deadline_seconds=0)
+        except Exception as e:   # some may be settled already
+            print(f"[worker] nack failed for {len(chunk)} message(s): {e}", file=sys.stderr)
+
+
+def _drain(subscriber: pubsub_v1.SubscriberClient, path: str, received: List, worker: threading.Thread,
+           claimed: Set[str]) -> bool:
+    """
+    Stop arrived mid-batch: keep the lease for the grace period, wait; if unfinished, drop
+    the batch's idempotency claims (else redeliveries stay IN_FLIGHT until the lease
+    lapses) and nack it.
+    """
+    started = time.monotonic()
+    ack_ids = [m.ack_id for m in received]
+    for chunk in _chunks(ack_ids):
+        try:
+            subscriber.modify_ack_deadline(subscription=path, ack_ids=chunk,
+                                           ack_deadline_seconds=int(DRAIN_GRACE) + 10)
+        except Exception as e:   # some may be settled already; still wait, release and nack
+            print(f"[worker] drain: lease extension failed for {len(chunk)} message(s): {e}",
+                  file=sys.stderr)
+    worker.join(DRAIN_GRACE)
+    abandoned = worker.is_alive()
+    if abandoned:
+        try:
+            idempotency.release_many(list(claimed))
+        except Exception as e:
+            print(f"[worker] drain: releasing {len(claimed)} claim(s) failed: {e}", file=sys.stderr)
+        _nack(subscriber, path, ack_ids)
+    print(json.dumps({"drain": {
+        "consumer": "content.requested:batch",
+        "grace_s": DRAIN_GRACE,
+        "in_flight_at_signal": len(received),
+        "finished": 0 if abandoned else len(received),
+        "nacked_in_flight": len(received) if abandoned else 0,
+        "ms": round((time.monotonic() - started) * 1000),
+    }}), file=sys.stderr)
+    return not abandoned
+
+
+def _process(subscriber: pubsub_v1.SubscriberClient, path: str, received: List, claimed: Set[str]) -> None:
+    """`claimed` holds the keys this batch has claimed and not yet settled (for _drain)."""
+    started = time.monotonic()
+    ack_ids = [m.ack_id for m in received]
+    for chunk in _chunks(ack_ids):   # hold the whole batch while it is worked on
+        subscriber.modify_ack_deadline(subscription=path, ack_ids=chunk, ack_deadline_seconds=ACK_DEADLINE)
+
+    payloads, outcomes = [], {}
+    for m in received:
+        try:
+            payload = codec.decode(m.message.data, m.message.attributes)
+        except Exception as e:
+            print(f"[worker] undecodable message {m.message.message_id}: {e}", file=sys.stderr)
+            outcomes[m.ack_id] = "ack"
+            continue
+        key = idempotency.key_for(payload, m.message.attributes) if idempotency.ENABLED else None
+        payloads.append((m.ack_id, key, payload))
+
+    # Redeliveries: already done → ack without work; held by another worker → nack
+    states = idempotency.claim_many([k for _, k, _ in payloads if k], "content.requested")
+    todo = []
+    for ack_id, key, payload in payloads:
+        state = states.get(key, idempotency.CLAIMED) if key else idempotency.CLAIMED
+        if state == idempotency.DUPLICATE:
+            outcomes[ack_id] = "ack"
+        elif state == idempotency.IN_FLIGHT:
+            outcomes[ack_id] = "nack"
+        else:
+            todo.append((ack_id, key, payload))
+    claimed.update(k for _, k, _ in todo if k)
+
+    if todo:
+        try:
+            results = handle_batch([p for _, _, p in todo])
+        except Exception as e:   # shared step failed (e.g. get_all): every item gets it
+            results = [e] * len(todo)
+        done, failed = [], []
+        for (ack_id, key, _), result in zip(todo, results):
+            if isinstance(result, Exception):
+                failed.append(key)
+                if _transient(result):
+                    outcomes[ack_id] = "nack"
+                else:
+                    # Permanent/unknown: ACK to avoid loops (DLQ via max-attempts on the sub)
+                    print(f"[worker] failed: {result}", file=sys.stderr)
+                    outcomes[ack_id] = "ack"
+            else:
+                done.append(key)
+                outcomes[ack_id] = "ack"
+        idempotency.complete_many([k for k in done if k])
+        idempotency.release_many([k for k in failed if k])
+        claimed.clear()
+
+    acks = [a for a, o in outcomes.items() if o == "ack"]
+    nacks = [a for a, o in outcomes.items() if o == "nack"]
+    for chunk in _chunks(acks):
+        subscriber.acknowledge(subscription=path, ack_ids=chunk)
+    for chunk in _chunks(nacks):
+        subscriber.modify_ack_deadline(subscription=path, ack_ids=chunk, ack_deadline_seconds=0)
+    print(json.dumps({"batch": {"messages": len(received), "acked": len(acks), "nacked": len(nacks),
+                                "ms": round((time.monotonic() - started) * 1000)}}), file=sys.stderr)
+
+
+def main():
+    if not PROJECT:
+        sys.exit("[worker] Missing GCP_PROJECT")
+    subscriber = pubsub_v1.SubscriberClient()
+    path = subscriber.subscription_path(PROJECT, SUBSCRIPTION)
+    print(f"[worker] Batching {path}: size={BATCH_SIZE} window={BATCH_WINDOW}s", file=sys.stderr)
+
+    def stop(*_):
+        global _running
+        _running = False
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        while _running:
+            received = _collect(subscriber, path)
+            if not received:
+                continue
+            if not _running:
+                # stopped while the batch was filling: hand it back rather than start it
+                _nack(subscriber, path, [m.ack_id for m in received])
+                print(json.dumps({"drain": {"consumer": "content.requested:batch",
+                                            "nacked_unstarted": len(received)}}), file=sys.stderr)
+                break
+            claimed: Set[str] = set()
+            worker = threading.Thread(target=_process, args=(subscriber, path, received, claimed),
+                                      name="batch", daemon=True)
+            worker.start()
+            while worker.is_alive() and _running:
+                worker.join(0.5)
+            if worker.is_alive() and not _drain(subscriber, path, received, worker, claimed):
+                # Abandoned batch was nacked; don't wait on its upload threads.
+                subscriber.close()
+                sys.stderr.flush()
+                os._exit(0)
+    finally:
+        subscriber.close()
+
+
+if __name__ == "__main__":
+    main()
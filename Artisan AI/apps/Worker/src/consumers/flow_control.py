@@ -0,0 +1,466 @@
+# Worker/src/consumers/flow_control.py
+# Flow control, scheduling and metrics for streaming-pull consumers, all from env:
+#   PULL_MAX_MESSAGES                  outstanding (leased, unacked) messages   (default 10)
+#   PULL_MAX_BYTES                     outstanding bytes                        (default 100 MiB)
+#   PULL_THREADS                       handler threads (default PULL_MAX_MESSAGES)
+#   PULL_SCHEDULER                     "thread" (default) | "asyncio"
+#   PULL_MAX_LEASE_SECONDS             stop extending a message's lease after this (default 3600)
+#   PULL_MIN_LEASE_EXTENSION_SECONDS   lower bound per lease extension (0 = client default)
+#   PULL_MAX_LEASE_EXTENSION_SECONDS   upper bound per lease extension (0 = client default)
+#   PULL_METRICS_INTERVAL_SECONDS      JSON metrics line on stderr every N s (0 = off; default 60)
+#   PULL_LANE_WEIGHTS                  share of threads per priority lane  (default "interactive=4,bulk=1")
+#   PULL_RESERVED_THREADS              threads only the interactive lane may use (default THREADS // 4, ≥ 1)
+#   DRAIN_GRACE_SECONDS                on SIGTERM, time in-flight handlers get to finish (default 8;
+#                                      keep it under the platform's kill timeout — Cloud Run
+#                                      sends SIGKILL 10 s after SIGTERM)
+# Size PULL_MAX_MESSAGES to the model quota (≈ requests/min × seconds per call / 60): every
+# leased message beyond what the handler threads can run just sits in a queue with its lease
+# being extended. The client library defaults (1000 messages, 10 threads) do exactly that.
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import queue
+import asyncio
+import threading
+import functools
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from google.cloud import pubsub_v1
+from google.cloud.pubsub_v1.subscriber.scheduler import Scheduler, ThreadScheduler
+
+MAX_MESSAGES = int(os.getenv("PULL_MAX_MESSAGES", "10"))
+MAX_BYTES = int(os.getenv("PULL_MAX_BYTES", str(100 * 1024 * 1024)))
+THREADS = int(os.getenv("PULL_THREADS") or MAX_MESSAGES)
+SCHEDULER = os.getenv("PULL_SCHEDULER", "thread").strip().lower()
+MAX_LEASE_SECONDS = int(os.getenv("PULL_MAX_LEASE_SECONDS", "3600"))
+MIN_LEASE_EXTENSION = int(os.getenv("PULL_MIN_LEASE_EXTENSION_SECONDS", "0"))
+MAX_LEASE_EXTENSION = int(os.getenv("PULL_MAX_LEASE_EXTENSION_SECONDS", "0"))
+METRICS_INTERVAL = float(os.getenv("PULL_METRICS_INTERVAL_SECONDS", "60"))
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    weights: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, w = part.partition("=")
+        if name.strip() and w.strip():
+            weights[name.strip()] = float(w)
+    return weights
+
+
+INTERACTIVE = "interactive"
+LANE_WEIGHTS = _parse_weights(os.getenv("PULL_LANE_WEIGHTS", "interactive=4,bulk=1"))
+RESERVED_THREADS = int(os.getenv("PULL_RESERVED_THREADS") or max(1, THREADS // 4))
+DRAIN_GRACE = float(os.getenv("DRAIN_GRACE_SECONDS", "8"))
+
+
+def flow_control() -> pubsub_v1.types.FlowControl:
+    return pubsub_v1.types.FlowControl(
+        max_messages=MAX_MESSAGES,
+        max_bytes=MAX_BYTES,
+        max_lease_duration=MAX_LEASE_SECONDS,
+        min_duration_per_lease_extension=MIN_LEASE_EXTENSION,
+        max_duration_per_lease_extension=MAX_LEASE_EXTENSION,
+    )
+
+
+def settings_summary() -> Dict[str, Any]:
+    return {
+        "max_messages": MAX_MESSAGES, "max_bytes": MAX_BYTES, "threads": THREADS,
+        "scheduler": SCHEDULER, "max_lease_s": MAX_LEASE_SECONDS,
+        "lease_extension_s": [MIN_LEASE_EXTENSION or "auto", MAX_LEASE_EXTENSION or "auto"],
+    }
+
+
+# ------------------------------------------------------------------------------
+# Schedulers
+# ------------------------------------------------------------------------------
+def _unwrap(callback: Callable):
+    """
+    The streaming pull manager schedules partial(_wrap_callback_errors, user_callback,
+    on_error), which calls the user callback and drops its result; returns
+    (user_callback, on_error), or (None, None) for anything else.
+    """
+    if (isinstance(callback, functools.partial) and len(callback.args) == 2
+            and getattr(callback.func, "__name__", "") == "_wrap_callback_errors"):
+        return callback.args
+    return None, None
+
+
+class AsyncioScheduler(Scheduler):
+    """
+    Runs callbacks as tasks on a private event loop thread. `async def` message callbacks
+    (or sync ones returning a coroutine) are awaited on the loop itself (no thread per
+    message); plain callables are offloaded to the sized executor, so sync handlers behave
+    as with ThreadScheduler.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self._queue: queue.Queue = queue.Queue()
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._waiting: Dict[int, Any] = {}        # scheduled, callback not started yet
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="pull-asyncio", daemon=True)
+        self._thread.start()
+
+    @property
+    def queue(self) -> queue.Queue:
+        return self._queue
+
+    def schedule(self, callback: Callable, *args, **kwargs) -> None:
+        token = id(args[0]) if args else id(callback)
+        with self._lock:
+            if args:
+                self._waiting[token] = args[0]
+        asyncio.run_coroutine_threadsafe(self._run(token, callback, args, kwargs), self._loop)
+
+    def _started(self, token: int) -> None:
+        with self._lock:
+            self._waiting.pop(token, None)
+
+    async def _run(self, token: int, callback: Callable, args, kwargs) -> None:
+        handler, on_error = _unwrap(callback)
+        if handler is None:
+            def _call():
+                self._started(token)
+                return callback(*args, **kwargs)
+
+            await self._loop.run_in_executor(self._executor, _call)
+            return
+
+        # Same contract as the client's own wrapper: an exception nacks and is reported.
+        message = args[0]
+        try:
+            if asyncio.iscoroutinefunction(handler):
+                self._started(token)
+                result = handler(message)
+            else:
+                def _call():
+                    self._started(token)
+                    return handler(message)
+
+                result = await self._loop.run_in_executor(self._executor, _call)
+            if asyncio.iscoroutine(result):
+                await result
+        except asyncio.CancelledError:
+            message.nack()
+            raise
+        except BaseException as exc:
+            message.nack()
+            on_error(exc)
+
+    def shutdown(self, await_msg_callbacks: bool = False) -> List[Any]:
+        with self._lock:
+            dropped = list(self._waiting.values())
+            self._waiting.clear()
+        self._executor.shutdown(wait=await_msg_callbacks, cancel_futures=True)
+        asyncio.run_coroutine_threadsafe(self._end_tasks(cancel=not await_msg_callbacks), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        return dropped
+
+    async def _end_tasks(self, cancel: bool) -> None:
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        if cancel:
+            for t in tasks:
+                t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def make_scheduler() -> Scheduler:
+    executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="pull-handler")
+    if THREADS < MAX_MESSAGES:
+        print(f"[worker] PULL_THREADS={THREADS} < PULL_MAX_MESSAGES={MAX_MESSAGES}: "
+              "extra messages wait in the executor queue while their leases are extended",
+              file=sys.stderr)
+    if SCHEDULER == "asyncio":
+        return AsyncioScheduler(executor)
+    return ThreadScheduler(executor=executor)
+
+
+# ------------------------------------------------------------------------------
+# Priority lanes
+# ------------------------------------------------------------------------------
+class LaneScheduler:
+    """
+    One pool of THREADS handler threads shared by several subscriptions (lanes). Each
+    lane's streaming pull gets lane(name) as its Scheduler. Free threads take the next
+    callback by stride scheduling over the lane weights (weighted fair: under contention
+    lane shares converge to the weight ratio; an idle lane's share goes to the others),
+    and lanes other than "interactive" may occupy at most THREADS - RESERVED threads, so a
+    backfill can never leave interactive requests without a thread.
+    """
+
+    def __init__(self, threads: int = THREADS, weights: Optional[Dict[str, float]] = None,
+                 reserved: int = RESERVED_THREADS):
+        weights = weights or LANE_WEIGHTS
+        reserved = min(reserved, threads - 1)
+        self._cond = threading.Condition()
+        self._queues: Dict[str, deque] = {n: deque() for n in weights}
+        self._stride = {n: 1.0 / w for n, w in weights.items()}
+        self._pass = {n: 0.0 for n in weights}
+        self._vtime = 0.0                    # pass of the last lane picked
+        self._running = {n: 0 for n in weights}
+        self._cap = {n: threads if n == INTERACTIVE else threads - reserved for n in weights}
+        self._dispatched = {n: 0 for n in weights}
+        self._open = set()
+        self._closed = False
+        for i in range(threads):
+            threading.Thread(target=self._work, name=f"pull-lane-{i}", daemon=True).start()
+
+    def lane(self, name: str) -> "_Lane":
+        if name not in self._queues:
+            raise ValueError(f"unknown lane {name!r}; PULL_LANE_WEIGHTS has {sorted(self._queues)}")
+        with self._cond:
+            self._open.add(name)
+        return _Lane(self, name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {n: {"queued": len(q), "running": self._running[n], "cap": self._cap[n],
+                        "dispatched": self._dispatched[n]} for n, q in self._queues.items()}
+
+    def _submit(self, name: str, item) -> None:
+        with self._cond:
+            if not self._queues[name] and not self._running[name]:
+                # a lane coming back from idle starts at the current virtual time (no banked credit)
+                self._pass[name] = max(self._pass[name], self._vtime)
+            self._queues[name].append(item)
+            self._cond.notify()
+
+    def _pick(self) -> Optional[str]:
+        ready = [n for n, q in self._queues.items() if q and self._running[n] < self._cap[n]]
+        if not ready:
+            return None
+        name = min(ready, key=lambda n: self._pass[n])
+        self._vtime = self._pass[name]
+        self._pass[name] += self._stride[name]
+        return name
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                name = self._pick()
+                while name is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    name = self._pick()
+                callback, args, kwargs = self._queues[name].popleft()
+                self._running[name] += 1
+                self._dispatched[name] += 1
+            try:
+                callback(*args, **kwargs)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._cond:
+                    self._running[name] -= 1
+                    self._cond.notify_all()
+
+    def _shutdown_lane(self, name: str, await_msg_callbacks: bool) -> List[Any]:
+        with self._cond:
+            dropped = [args[0] for _, args, _ in self._queues[name] if args]
+            self._queues[name].clear()
+            self._open.discard(name)
+            if await_msg_callbacks:
+                while self._running[name]:
+                    self._cond.wait()
+            if not self._open:
+                self._closed = True
+                self._cond.notify_all()
+        return dropped
+
+
+class _Lane(Scheduler):
+    """Scheduler facade for one lane; the streaming pull manager owns one per subscription."""
+
+    def __init__(self, owner: LaneScheduler, name: str):
+        self._owner = owner
+        self._name = name
+        self._queue: queue.Queue = queue.Queue()   # the manager's ack/nack request queue
+
+    @property
+    def queue(self) -> queue.Queue:
+        return self._queue
+
+    def schedule(self, callback: Callable, *args, **kwargs) -> None:
+        self._owner._submit(self._name, (callback, args, kwargs))
+
+    def shutdown(self, await_msg_callbacks: bool = False) -> List[Any]:
+        return self._owner._shutdown_lane(self._name, await_msg_callbacks)
+
+
+# ------------------------------------------------------------------------------
+# Metrics
+# ------------------------------------------------------------------------------
+class Metrics:
+    """In-process counters, logged as one JSON line per interval (log-based metrics)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        self.in_flight = 0
+        self.in_flight_bytes = 0
+
+    def _reset(self) -> None:
+        self.counts: Dict[str, int] = {"received": 0, "acked": 0, "nacked": 0, "failed": 0}
+        self.durations: List[float] = []
+        self.peak_in_flight = 0
+
+    def start(self, size: int) -> float:
+        with self._lock:
+            self.counts["received"] += 1
+            self.in_flight += 1
+            self.in_flight_bytes += size
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return time.monotonic()
+
+    def finish(self, started: float, size: int, outcome: str) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.in_flight_bytes -= size
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            self.durations.append(time.monotonic() - started)
+
+    def snapshot(self, reset: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            d = sorted(self.durations)
+            out = {
+                **self.counts,
+                "in_flight": self.in_flight,
+                "in_flight_bytes": self.in_flight_bytes,
+                "peak_in_flight": self.peak_in_flight,
+                "handler_ms": {
+                    "p50": round(d[len(d) // 2] * 1000, 1) if d else None,
+                    "p95": round(d[int(len(d) * 0.95)] * 1000, 1) if d else None,
+                    "max": round(d[-1] * 1000, 1) if d else None,
+                },
+            }
+            if reset:
+                self._reset()
+                self.peak_in_flight = self.in_flight
+        return out
+
+    def tracked(self, fn: Callable) -> Callable:
+        """Wrap a message callback; `fn` returns "acked" | "nacked" | "failed"."""
+        @functools.wraps(fn)
+        def wrapper(message):
+            size = getattr(message, "size", 0) or 0
+            started = self.start(size)
+            outcome = "failed"
+            try:
+                outcome = fn(message) or "acked"
+            finally:
+                self.finish(started, size, outcome)
+        return wrapper
+
+    def report_forever(self, name: str, stop: Optional[threading.Event] = None) -> None:
+        """Start a daemon thread logging a metrics line every PULL_METRICS_INTERVAL_SECONDS."""
+        if METRICS_INTERVAL <= 0:
+            return
+        stop = stop or threading.Event()
+
+        def _loop():
+            while not stop.wait(METRICS_INTERVAL):
+                print(json.dumps({"pull_metrics": {"consumer": name, **self.snapshot()}}), file=sys.stderr)
+
+        threading.Thread(target=_loop, name=f"{name}-metrics", daemon=True).start()
+
+
+# ------------------------------------------------------------------------------
+# Graceful drain
+# ------------------------------------------------------------------------------
+class Drain:
+    """
+    In-flight tracking and graceful shutdown for streaming pull. Subscribe with
+    await_callbacks_on_shutdown=True and wrap the callback with guard(); then drain():
+      1. stop pulling (cancel the futures): messages held by flow control or still queued
+         in the scheduler are nacked by the client right away, nothing new is leased;
+      2. handlers already running get DRAIN_GRACE seconds to finish and ack — the client
+         keeps extending their leases meanwhile; callbacks that start late nack at once;
+      3. whatever is still running after that is nacked (synchronous modify_ack_deadline 0),
+         after on_abandon(messages) has dropped their idempotency claims, so the redelivery
+         is processed rather than refused as in flight until the claim's lease runs out.
+    Logs one JSON "drain" line. Returns False if work had to be abandoned.
+    """
+
+    def __init__(self, subscriber: pubsub_v1.SubscriberClient, grace: float = DRAIN_GRACE,
+                 on_abandon: Optional[Callable[[List[Any]], None]] = None):
+        self._subscriber = subscriber
+        self.grace = grace
+        self._on_abandon = on_abandon
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Any] = {}      # ack_id → (subscription path, message)
+        self._refused = 0
+        self.draining = threading.Event()
+
+    def guard(self, path: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(message):
+            with self._lock:
+                if self.draining.is_set():
+                    self._refused += 1
+                    message.nack()
+                    return "nacked"
+                self._in_flight[message.ack_id] = (path, message)
+            try:
+                return fn(message)
+            finally:
+                with self._lock:
+                    self._in_flight.pop(message.ack_id, None)
+        return wrapper
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def drain(self, futures: List[Any], name: str) -> bool:
+        started = time.monotonic()
+        with self._lock:
+            self.draining.set()
+            at_signal = len(self._in_flight)
+        for f in futures:
+            f.cancel()
+        deadline = started + self.grace
+        clean = True
+        for f in futures:
+            try:
+                f.result(timeout=max(0.0, deadline - time.monotonic()))
+            except TimeoutError:
+                clean = False
+            except Exception:
+                pass    # stream already failed; nothing left to wait for
+
+        with self._lock:
+            leftover = list(self._in_flight.values())
+        if leftover and self._on_abandon:
+            try:
+                self._on_abandon([message for _, message in leftover])
+            except Exception as e:
+                print(f"[worker] drain: releasing claims failed for {len(leftover)} message(s): {e}",
+                      file=sys.stderr)
+        by_path: Dict[str, List[str]] = {}
+        for path, message in leftover:
+            by_path.setdefault(path, []).append(message.ack_id)
+        for path, ack_ids in by_path.items():
+            try:
+                self._subscriber.modify_ack_deadline(subscription=path, ack_ids=ack_ids, ack_deadline_seconds=0)
+            except Exception as e:
+                print(f"[worker] drain: nack failed for {len(ack_ids)} message(s) on {path}: {e}", file=sys.stderr)
+
+        print(json.dumps({"drain": {
+            "consumer": name,
+            "grace_s": self.grace,
+            "in_flight_at_signal": at_signal,
+            "finished": at_signal - len(leftover),
+            "nacked_in_flight": len(leftover),
+            "refused_after_signal": self._refused,
+            "ms": round((time.monotonic() - started) * 1000),
+        }}), file=sys.stderr)
+        return clean and not leftover
@@ -0,0 +1,90 @@
+# Worker/src/consumers/local_bus.py
+# Offline consumer for the API's file-backed event bus (EVENT_BUS=file, see
+# apps/api/src/repos/eventbus.py). Tails {EVENT_LOG_DIR}/{topic}.jsonl and feeds each
+# record to the same handlers as the push endpoint, so API + worker run on one machine
+# with no Pub/Sub. Record format (one JSON object per line):
+#   {"id": "<topic>:<byte offset>", "ts": <unix>, "attrs": {...}, "data": "<base64>"}
+# Progress is checkpointed per topic in {topic}.offset after every handled record
+# (at-least-once: a crash re-delivers the record in flight).
+#
+#   EVENT_BUS=file python -m src.consumers.local_bus
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import base64
+import signal
+from pathlib import Path
+
+from ..runner import dispatch
+from ..utils import codec
+
+LOG_DIR = Path(os.getenv("EVENT_LOG_DIR", "/tmp/artisan-events"))
+TOPICS = [t.strip() for t in os.getenv(
+    "LOCAL_BUS_TOPICS", "content.requested,marketing.asset.requested,media.uploaded"
+).split(",") if t.strip()]
+POLL_SECONDS = float(os.getenv("LOCAL_BUS_POLL_SECONDS", "0.2"))
+
+_running = True
+
+
+def _load_offset(topic: str) -> int:
+    try:
+        return int((LOG_DIR / f"{topic}.offset").read_text().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _save_offset(topic: str, offset: int) -> None:
+    tmp = LOG_DIR / f".{topic}.offset.tmp"
+    tmp.write_text(str(offset))
+    os.replace(tmp, LOG_DIR / f"{topic}.offset")
+
+
+def _drain(topic: str, offset: int) -> int:
+    """Handle every complete record after `offset`; returns the new offset."""
+    path = LOG_DIR / f"{topic}.jsonl"
+    if not path.exists():
+        return offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):   # writer mid-append; pick it up next poll
+                break
+            try:
+                record = json.loads(line)
+                payload = codec.decode(base64.b64decode(record["data"]), record.get("attrs"))
+                dispatch(payload)
+            except Exception as e:
+                # Same policy as the pull consumer: log and move on rather than loop forever.
+                print(f"[local_bus] {topic} @ {offset}: {e}", file=sys.stderr)
+            offset += len(line)
+            _save_offset(topic, offset)
+            if not _running:
+                break
+    return offset
+
+
+def main():
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    offsets = {t: _load_offset(t) for t in TOPICS}
+    print(f"[local_bus] tailing {', '.join(TOPICS)} in {LOG_DIR}", file=sys.stderr)
+
+    def stop(*_):
+        global _running
+        _running = False
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while _running:
+        before = dict(offsets)
+        for topic in TOPICS:
+            offsets[topic] = _drain(topic, offsets[topic])
+        if offsets == before:
+            time.sleep(POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
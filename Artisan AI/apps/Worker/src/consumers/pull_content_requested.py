@@ -1,11 +1,24 @@
 # Worker/src/consumers/pull_content_requested.py
+# Priority lanes: set PUBSUB_SUBSCRIPTION_INTERACTIVE to also pull interactive requests
+# from their own subscription; both lanes then share one handler pool with weighted fair
+# scheduling and reserved interactive threads (flow_control.LaneScheduler). The topic is
+# split by the `priority` attribute the API sets (filters are fixed at creation); like the
+# push endpoint, a message without the attribute counts as interactive:
+#   gcloud pubsub subscriptions create content.requested-interactive --topic=content.requested \
+#     --message-filter='attributes.priority = "interactive" OR NOT attributes:priority'
+#   gcloud pubsub subscriptions create content.requested-bulk --topic=content.requested \
+#     --message-filter='attributes.priority = "bulk"'
+# and run with PUBSUB_SUBSCRIPTION=content.requested-bulk.
+# SIGTERM/SIGINT drain instead of dropping work: stop pulling, give running generations
+# DRAIN_GRACE_SECONDS to finish (leases kept alive), then release their idempotency claims
+# and nack the rest (flow_control.Drain).
 from __future__ import annotations
 
 import os
 import sys
-import json
 import base64
 import signal
+import threading
 
 from google.cloud import pubsub_v1, storage
 from google.api_core.exceptions import (
@@ -18,6 +31,8 @@ from google.api_core.exceptions import (
 
 # Business logic handler
 from ..handlers.handle_content_requested import handle as handle_content
+from ..utils import codec, idempotency
+from . import flow_control
 
 
 # ------------------------------------------------------------------------------
@@ -25,11 +40,13 @@ from ..handlers.handle_content_requested import handle as handle_content
 # ------------------------------------------------------------------------------
 PROJECT = os.getenv("GCP_PROJECT")
 SUBSCRIPTION = os.getenv("PUBSUB_SUBSCRIPTION", "content.requested-pull")
+SUBSCRIPTION_INTERACTIVE = os.getenv("PUBSUB_SUBSCRIPTION_INTERACTIVE", "")
 BUCKET = os.getenv("GCS_BUCKET")
 SA_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 
 print(f"[worker] GCP_PROJECT={PROJECT}", file=sys.stderr)
 print(f"[worker] PUBSUB_SUBSCRIPTION={SUBSCRIPTION}", file=sys.stderr)
+print(f"[worker] PUBSUB_SUBSCRIPTION_INTERACTIVE={SUBSCRIPTION_INTERACTIVE or '-'}", file=sys.stderr)
 print(f"[worker] GCS_BUCKET={BUCKET}", file=sys.stderr)
 print(f"[worker] GOOGLE_APPLICATION_CREDENTIALS={SA_PATH}", file=sys.stderr)
 
@@ -51,59 +68,104 @@ except Forbidden:
 # ------------------------------------------------------------------------------
 # Helpers
 # ------------------------------------------------------------------------------
-def _decode(msg_bytes: bytes) -> dict:
-    """Decode either raw JSON bytes or {message:{data: base64json}} envelope."""
-    # raw json
+def _decode(msg_bytes: bytes, attrs=None) -> dict:
+    """
+    Decode the body once, by its content_type attribute (msgpack or JSON). A JSON body
+    that is itself a push-style {message:{data: base64, attributes}} envelope is unwrapped.
+    """
     try:
-        return json.loads(msg_bytes.decode())
-    except Exception:
-        pass
-    # envelope form
-    try:
-        env = json.loads(msg_bytes.decode())
-        data = env.get("message", {}).get("data")
-        if data:
-            return json.loads(base64.b64decode(data).decode())
-    except Exception:
-        pass
-    raise ValueError("Unrecognized message format")
+        payload = codec.decode(msg_bytes, attrs)
+    except Exception as e:
+        raise ValueError(f"Unrecognized message format: {e}") from e
+    inner = payload.get("message") if isinstance(payload, dict) else None
+    if isinstance(inner, dict) and inner.get("data"):
+        return codec.decode(base64.b64decode(inner["data"]), inner.get("attributes"))
+    return payload
+
+def _release_claims(messages) -> None:
+    """Drain hook: drop the idempotency claims of handlers abandoned at shutdown."""
+    if not idempotency.ENABLED:
+        return
+    keys = []
+    for m in messages:
+        try:
+            keys.append(idempotency.key_for(_decode(m.data, m.attributes), m.attributes))
+        except Exception:
+            continue    # undecodable: run_once never claimed it
+    idempotency.release_many([k for k in keys if k])
 
 def _callback(message: pubsub_v1.subscriber.message.Message):
     try:
-        payload = _decode(message.data)
-        handle_content(payload)  # your business logic
+        payload = _decode(message.data, message.attributes)
+        idempotency.run_once(payload, handle_content, message.attributes)  # your business logic
         message.ack()
+        return "acked"
     except (NotFound, BadRequest, Forbidden) as e:
         # Permanent error (bad config/input). Mark job failed in handler if needed, then ACK.
         print(f"[worker] permanent error: {e}", file=sys.stderr)
         message.ack()
-    except (ServiceUnavailable, DeadlineExceeded, ConnectionError) as e:
-        # Transient error: let Pub/Sub retry.
+        return "failed"
+    except (ServiceUnavailable, DeadlineExceeded, ConnectionError, idempotency.InFlight) as e:
+        # Transient error (or a duplicate still being processed): let Pub/Sub retry.
         print(f"[worker] transient error, will retry: {e}", file=sys.stderr)
         message.nack()
+        return "nacked"
     except Exception as e:
         # Unknown; to avoid infinite loops, prefer ACK (or send to DLQ via max-attempts on sub).
         print(f"[worker] unexpected error: {e}", file=sys.stderr)
         message.ack()
+        return "failed"
 
 # ------------------------------------------------------------------------------
 # Main
 # ------------------------------------------------------------------------------
 def main():
     subscriber = pubsub_v1.SubscriberClient()
-    path = subscriber.subscription_path(PROJECT, SUBSCRIPTION)
-    print(f"[worker] Listening on {path}", file=sys.stderr)
-    future = subscriber.subscribe(path, callback=_callback)
+    if SUBSCRIPTION_INTERACTIVE:
+        lanes = flow_control.LaneScheduler()
+        subscriptions = {flow_control.INTERACTIVE: SUBSCRIPTION_INTERACTIVE, "bulk": SUBSCRIPTION}
+        schedulers = {name: lanes.lane(name) for name in subscriptions}
+    else:
+        subscriptions = {"": SUBSCRIPTION}
+        schedulers = {"": flow_control.make_scheduler()}
+
+    drain = flow_control.Drain(subscriber, on_abandon=_release_claims)
+    futures = []
+    for lane, subscription in subscriptions.items():
+        path = subscriber.subscription_path(PROJECT, subscription)
+        name = f"content.requested:{lane}" if lane else "content.requested"
+        print(f"[worker] Listening on {path} ({lane or 'single lane'}) {flow_control.settings_summary()}",
+              file=sys.stderr)
+        metrics = flow_control.Metrics()
+        futures.append(subscriber.subscribe(
+            path,
+            callback=metrics.tracked(drain.guard(path, _callback)),
+            flow_control=flow_control.flow_control(),
+            scheduler=schedulers[lane],
+            await_callbacks_on_shutdown=True,   # cancel() lets running handlers finish
+        ))
+        metrics.report_forever(name)
+
+    stopping = threading.Event()
+    for f in futures:
+        f.add_done_callback(lambda _: stopping.set())   # a stream died: shut the rest down too
 
     def stop(*_):
-        future.cancel()
+        stopping.set()
     signal.signal(signal.SIGINT, stop)
     signal.signal(signal.SIGTERM, stop)
 
-    try:
-        future.result()
-    finally:
-        subscriber.close()
+    stopping.wait()
+    failed = [f for f in futures if f.done()]
+    print(f"[worker] Draining: {drain.in_flight()} in flight, grace {drain.grace}s", file=sys.stderr)
+    clean = drain.drain(futures, "content.requested")
+    subscriber.close()
+    if not clean:
+        # Handlers still running were nacked; don't wait on their (non-daemon) threads.
+        sys.stderr.flush()
+        os._exit(0)
+    for f in failed:
+        f.result()   # surface the stream error that triggered the shutdown
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,21 @@
 # Worker/src/handlers/handle_marketing_requested.py
 from __future__ import annotations
-import os, uuid, json, time
-from typing import Dict, List
+import os, uuid, json, time, hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Union
 from google.cloud import firestore
 from google.cloud.firestore_v1 import SERVER_TIMESTAMP
 from ..utils import storage  # uses GCS_BUCKET and fails fast if misconfigured
+from ..utils import vertex
 
 db = firestore.Client()
 
+DEFAULT_MODEL = os.getenv("CONTENT_MODEL", "gemini-2.5-pro")
+IO_THREADS = int(os.getenv("CONTENT_IO_THREADS", "16"))     # parallel uploads per batch
+HASHTAGS = ("#handmade", "#supportlocal", "#artisan")
+BEST_TIME_ISO = "2025-09-19T13:30:00Z"  # TODO: compute based on audience
+
 # 1×1 transparent PNG (valid PNG bytes)
 _TRANSPARENT_PNG = (
     b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01"
@@ -15,15 +23,107 @@ _TRANSPARENT_PNG = (
     b"\x00\x00\x02\x00\x01\xe2!\xbc3\x00\x00\x00\x00IEND\xaeB`\x82"
 )
 
+_PLACEHOLDER_DIGEST = hashlib.sha256(_TRANSPARENT_PNG).hexdigest()[:16]
+
 def generate_mock_image(product_id: str, channel: str) -> str:
     """
     MVP: creates a tiny placeholder PNG and uploads it to GCS.
-    Returns the gs:// URI.
+    Returns the gs:// URI. The key is derived from the image bytes, so a redelivered
+    request finds the existing object instead of uploading a new one.
     """
-    key = f"marketing/{product_id}/{channel}/{uuid.uuid4().hex}.png"
+    key = f"marketing/{product_id}/{channel}/{_PLACEHOLDER_DIGEST}.png"
+    if storage.exists(key):
+        return storage.uri(key)
     uri = storage.write_bytes(key, _TRANSPARENT_PNG, content_type="image/png")
     return uri
 
+def _job(payload: Dict) -> Dict:
+    payload = payload.get("data") or payload   # API envelopes nest the fields under "data"
+    return {
+        "product_id": payload["product_id"],
+        "lang": payload.get("lang", "en"),
+        "channel": payload.get("channel", "instagram"),
+        "model": payload.get("model") or DEFAULT_MODEL,
+    }
+
+
+def handle_batch(payloads: List[Dict]) -> List[Union[Dict, Exception]]:
+    """
+    Handle many requests with shared round trips: one get_all for every referenced
+    product, one copy-generation call per model, placeholder uploads on a small thread
+    pool and Firestore writes committed ≤500 per batch. Returns one entry per payload,
+    in order: the handle() result, or the exception that item failed with.
+    """
+    results: List[Union[Dict, Exception, None]] = [None] * len(payloads)
+    jobs: Dict[int, Dict] = {}
+    for i, payload in enumerate(payloads):
+        try:
+            jobs[i] = _job(payload)
+        except Exception as e:   # malformed payload fails alone
+            results[i] = e
+    if not jobs:
+        return results
+
+    # (Optional) fetch product metadata for better copy — every product in one get_all
+    refs = {j["product_id"]: db.collection("products").document(j["product_id"]) for j in jobs.values()}
+    products = {snap.id: (snap.to_dict() or {}) for snap in db.get_all(list(refs.values()))}
+
+    # Copy: one call per model for all of its items
+    by_model: Dict[str, List[int]] = defaultdict(list)
+    for i, job in jobs.items():
+        by_model[job["model"]].append(i)
+    post_texts: Dict[int, str] = {}
+    for model, idxs in by_model.items():
+        items = [(products.get(jobs[i]["product_id"], {}), jobs[i]["product_id"], jobs[i]["lang"], jobs[i]["channel"])
+                 for i in idxs]
+        try:
+            post_texts.update(zip(idxs, vertex.generate_post_texts(model, items)))
+        except Exception as e:
+            for i in idxs:
+                results[i] = e
+
+    pending = [i for i in jobs if i in post_texts]
+    with ThreadPoolExecutor(max_workers=min(IO_THREADS, len(pending) or 1)) as pool:
+        uploads = {i: pool.submit(generate_mock_image, jobs[i]["product_id"], jobs[i]["channel"]) for i in pending}
+    docs: List[Tuple[int, str, Dict]] = []
+    for i in pending:
+        try:
+            image_uri = uploads[i].result()
+        except Exception as e:
+            results[i] = e
+            continue
+        job = jobs[i]
+        # Deterministic doc id (product_lang_channel)
+        doc_id = f"{job['product_id']}_{job['lang']}_{job['channel']}"
+        docs.append((i, doc_id, {
+            "id": doc_id,
+            "product_id": job["product_id"],
+            "lang": job["lang"],
+            "channel": job["channel"],
+            "post_text": post_texts[i],
+            "hashtags": list(HASHTAGS),
+            "best_time_iso": BEST_TIME_ISO,
+            "image_uri": image_uri,
+            "created_at": SERVER_TIMESTAMP,
+            "updated_at": SERVER_TIMESTAMP,
+        }))
+
+    for start in range(0, len(docs), 500):   # Firestore batch limit
+        chunk = docs[start:start + 500]
+        batch = db.batch()
+        for _, doc_id, doc in chunk:
+            batch.set(db.collection("marketing_assets").document(doc_id), doc, merge=True)
+        try:
+            batch.commit()
+        except Exception as e:
+            for i, _, _ in chunk:
+                results[i] = e
+            continue
+        for i, doc_id, doc in chunk:
+            results[i] = {"ok": True, "doc_id": doc_id, "image_uri": doc["image_uri"]}
+    return results
+
+
 def handle(payload: Dict):
     """
     Expected payload (flat):
@@ -34,42 +134,11 @@ def handle(payload: Dict):
         "channel": "instagram"
       }
     """
-    product_id: str = payload["product_id"]
-    lang: str = payload.get("lang", "en")
-    channel: str = payload.get("channel", "instagram")
-
-    # (Optional) fetch product metadata for better copy
-    prod = db.collection("products").document(product_id).get()
-    title = (prod.to_dict() or {}).get("title", product_id)
-
-    # Simple MVP copy
-    post_text = f"Discover handcrafted beauty from {title} ✨"
-    hashtags: List[str] = ["#handmade", "#supportlocal", "#artisan"]
-    best_time_iso = "2025-09-19T13:30:00Z"  # TODO: compute based on audience
-
-    image_uri = generate_mock_image(product_id, channel)
-
-    # Deterministic doc id (product_lang_channel)
-    doc_id = f"{product_id}_{lang}_{channel}"
-
-    db.collection("marketing_assets").document(doc_id).set(
-        {
-            "id": doc_id,
-            "product_id": product_id,
-            "lang": lang,
-            "channel": channel,
-            "post_text": post_text,
-            "hashtags": hashtags,
-            "best_time_iso": best_time_iso,
-            "image_uri": image_uri,
-            "created_at": SERVER_TIMESTAMP,
-            "updated_at": SERVER_TIMESTAMP,
-        },
-        merge=True,
-    )
-
+    result = handle_batch([payload])[0]
+    if isinstance(result, Exception):
+        raise result
     # Return value is optional for a push/pull handler
-    return {"ok": True, "doc_id": doc_id, "image_uri": image_uri}
+    return result
 
 
 # from google.cloud import firestore
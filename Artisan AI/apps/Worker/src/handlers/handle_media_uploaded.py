@@ -0,0 +1,108 @@
+# Worker/src/handlers/handle_media_uploaded.py
+# Purpose: Responsive image variants for uploaded product photos.
+# Do: media.uploaded → render 160/320/640/1280 px WebP (+ AVIF when the Pillow build
+#     supports it) in a process pool → upload as immutable objects → record the URLs
+#     on media/{sha256}.variants and products/{id}.image_variants[sha256].
+from __future__ import annotations
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from ..utils import storage  # uses GCS_BUCKET and fails fast if misconfigured
+from ..utils.imaging import render_variants, supported_formats
+
+db = firestore.Client()
+
+SIZES = tuple(int(x) for x in os.getenv("MEDIA_VARIANT_SIZES", "160,320,640,1280").split(",") if x.strip())
+FORMATS = supported_formats(
+    [x.strip() for x in os.getenv("MEDIA_VARIANT_FORMATS", "webp,avif").split(",") if x.strip()]
+)
+RENDER_TIMEOUT = float(os.getenv("MEDIA_RENDER_TIMEOUT_SECONDS", "120"))
+CACHE_CONTROL = "public, max-age=31536000, immutable"   # keys are content-addressed
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _executor() -> ProcessPoolExecutor:
+    """
+    Lazily start the pool. "spawn" so children don't inherit gRPC/GCS client state;
+    they only import utils.imaging.
+    """
+    global _pool
+    if _pool is None:
+        workers = int(os.getenv("MEDIA_WORKERS") or os.cpu_count() or 2)
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _variant_key(digest: str, width: int, fmt: str) -> str:
+    return f"media/variants/{digest[:2]}/{digest}/{width}.{fmt}"
+
+
+def _render_and_upload(digest: str, object_name: str) -> Dict[str, Any]:
+    data = storage.read_bytes(object_name)
+    orig_w, orig_h, rendered = _executor().submit(render_variants, data, SIZES, FORMATS).result(RENDER_TIMEOUT)
+
+    variants: Dict[str, Any] = {"width": orig_w, "height": orig_h}
+    for width, height, fmt, blob in rendered:
+        uri = storage.write_bytes(
+            _variant_key(digest, width, fmt), blob,
+            content_type=f"image/{fmt}", cache_control=CACHE_CONTROL,
+        )
+        variants.setdefault(fmt, []).append({"w": width, "h": height, "url": storage.public_url(uri)})
+    for fmt in FORMATS:
+        variants.get(fmt, []).sort(key=lambda v: v["w"])
+    return variants
+
+
+def _link_products(digest: str, variants: Dict[str, Any], product_id: Optional[str], public_url: Optional[str]) -> List[str]:
+    """Write image_variants[sha256] on the named product and on any product already using the image."""
+    field = FieldPath("image_variants", digest).to_api_repr()
+    patch = {field: variants, "updated_at": SERVER_TIMESTAMP}
+    products = db.collection("products")
+
+    ids = {product_id} if product_id else set()
+    if public_url:
+        q = products.where(filter=firestore.FieldFilter("images", "array_contains", public_url))
+        for snap in q.select(["__name__"]).limit(100).stream():
+            ids.add(snap.id)
+
+    linked = []
+    for pid in ids:
+        try:
+            products.document(pid).update(patch)
+            linked.append(pid)
+        except NotFound:
+            pass   # product not created yet
+    return linked
+
+
+def handle(payload: Dict):
+    """
+    Expected payload:
+      {
+        "type": "media.uploaded",
+        "data": {"sha256": "...", "object_name": "media/sha256/ab/<sha>.jpg",
+                 "public_url": "https://...", "content_type": "image/jpeg", "product_id": "p1"?}
+      }
+    Re-delivery is cheap: variants are rendered once per sha256.
+    """
+    data = payload.get("data") or payload
+    digest: str = data["sha256"]
+    object_name: str = data["object_name"]
+
+    media_ref = db.collection("media").document(digest)
+    variants = (media_ref.get().to_dict() or {}).get("variants")
+    if not variants:
+        variants = _render_and_upload(digest, object_name)
+        media_ref.set({"variants": variants, "updated_at": SERVER_TIMESTAMP}, merge=True)
+
+    linked = _link_products(digest, variants, data.get("product_id"), data.get("public_url"))
+    return {"ok": True, "sha256": digest, "products": linked}
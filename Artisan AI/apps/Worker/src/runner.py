@@ -1,10 +1,13 @@
 # apps/worker/src/runner.py
-import base64
 import json
+import base64
 import logging
 from fastapi import FastAPI, Request, HTTPException
 
 from .handlers.handle_content_requested import handle as handle_content
+from .handlers.handle_media_uploaded import handle as handle_media
+from .utils import codec, idempotency
+from .utils.handler_pool import HandlerPool, Saturated, RETRY_AFTER, INTERACTIVE
 
 # Optional: include if you added the marketing handler
 try:
@@ -27,7 +30,8 @@ def _decode_pubsub_message(envelope: dict) -> dict:
       },
       "subscription": "..."
     }
-    We publish base64-encoded JSON. Decode and return the dict payload.
+    data is the encoded envelope (msgpack or JSON, per attributes.content_type — see
+    utils/codec.py). Decode and return the dict payload.
     """
     msg = envelope.get("message")
     if not msg or "data" not in msg:
@@ -35,28 +39,76 @@ def _decode_pubsub_message(envelope: dict) -> dict:
 
     try:
         raw = base64.b64decode(msg["data"])
-        return json.loads(raw.decode("utf-8"))
+        return codec.decode(raw, msg.get("attributes"))
     except Exception as e:
         logger.exception("Failed to decode Pub/Sub message")
         raise HTTPException(status_code=400, detail=f"Invalid message data: {e}")
 
+# event type → handler; shared by the push endpoint and the local bus consumer
+HANDLERS = {
+    "content.requested": handle_content,
+    "media.uploaded": handle_media,
+}
+if handle_marketing:
+    HANDLERS["marketing.asset.requested"] = handle_marketing
+
+pool = HandlerPool()
+
+
+def dispatch(payload: dict):
+    """
+    Run the handler for payload["type"], at most once per idempotency_key/event_id
+    (utils/idempotency.py). Unknown types are logged and ignored.
+    """
+    event_type = payload.get("type")
+    handler = HANDLERS.get(event_type)
+    if handler is None:
+        logger.info("Ignoring unknown or unsupported event type: %s", event_type)
+        return None
+    return idempotency.run_once(payload, handler)
+
+
 @app.post("/_pubsub")
 async def pubsub_push(request: Request):
     envelope = await request.json()
     payload = _decode_pubsub_message(envelope)
+    attrs = envelope["message"].get("attributes") or {}
+    lane = attrs.get("priority") or INTERACTIVE
 
     event_type = payload.get("type")
     if not event_type:
         raise HTTPException(status_code=400, detail="Missing event 'type' in payload")
 
-    logger.info("Received event type=%s", event_type)
-
-    if event_type == "content.requested":
-        handle_content(payload)
-    elif event_type == "marketing.asset.requested" and handle_marketing:
-        handle_marketing(payload)
-    else:
+    logger.info("Received event type=%s lane=%s", event_type, lane)
+    if event_type not in HANDLERS:
         logger.info("Ignoring unknown or unsupported event type: %s", event_type)
+        return {"ok": True}
+
+    # Handlers block (Firestore/GCS/model calls): run them on the bounded pool so the
+    # loop keeps accepting deliveries; refuse outright when saturated (Pub/Sub backs off).
+    # Bulk deliveries are refused earlier, keeping PUSH_RESERVED slots for interactive ones.
+    try:
+        await pool.run(event_type, dispatch, payload, lane=lane)
+    except Saturated as e:
+        logger.warning("Rejecting %s with %s: %s", event_type, e.status_code, e.detail)
+        raise HTTPException(status_code=e.status_code, detail=e.detail,
+                            headers={"Retry-After": str(RETRY_AFTER)})
+    except idempotency.InFlight:
+        # Another delivery of the same event is running; non-2xx → Pub/Sub redelivers later
+        raise HTTPException(status_code=409, detail="event already being processed",
+                            headers={"Retry-After": str(RETRY_AFTER)})
 
     # 200 OK lets Pub/Sub mark delivery successful
     return {"ok": True}
+
+
+@app.get("/_pool")
+def pool_stats():
+    """Handler pool usage (in flight, per-type counts, limits, rejections)."""
+    return pool.stats()
+
+
+@app.on_event("shutdown")
+def _drain_pool():
+    # Runs after uvicorn's graceful-shutdown wait for in-flight deliveries.
+    logger.info(json.dumps({"drain": {"consumer": "push", **pool.drain()}}))
@@ -0,0 +1,33 @@
+# Worker/src/utils/codec.py
+# Decode event bodies published by the API (apps/api/src/repos/event_codec.py).
+# The format comes from message attributes, never from sniffing the bytes:
+#   content_type = "application/msgpack" | "application/json" (absent → JSON, legacy)
+#   schema_id    = "artisan.event.v1"                      (absent → legacy JSON envelope)
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Mapping, Optional
+
+try:
+    import msgpack
+except ImportError:  # JSON-only deployments
+    msgpack = None
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_MSGPACK = "application/msgpack"
+SUPPORTED_SCHEMAS = {"artisan.event.v1"}
+
+
+def decode(data: bytes, attrs: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    attrs = attrs or {}
+    schema = attrs.get("schema_id")
+    if schema and schema not in SUPPORTED_SCHEMAS:
+        raise ValueError(f"unsupported schema_id: {schema}")
+    ctype = attrs.get("content_type") or CONTENT_TYPE_JSON
+    if ctype == CONTENT_TYPE_MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack message received but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False)
+    if ctype == CONTENT_TYPE_JSON:
+        return json.loads(data)
+    raise ValueError(f"unsupported content_type: {ctype}")
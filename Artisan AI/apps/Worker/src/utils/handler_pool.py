@@ -0,0 +1,149 @@
+# Worker/src/utils/handler_pool.py
+# Bounded execution for the push endpoint: handlers are synchronous (Firestore/GCS/model
+# calls), so they run on a fixed thread pool instead of the event loop, and admission is
+# non-blocking — when a limit is hit the request is refused at once so Pub/Sub push backs
+# off and redelivers, rather than piling up requests past the ack deadline.
+#   PUSH_THREADS        handler threads                            (default 16)
+#   PUSH_QUEUE          admitted requests waiting for a thread     (default 0)
+#   PUSH_LIMITS         per-event-type caps, "type=n,type=n"       (default: no cap below the pool)
+#   PUSH_RETRY_AFTER    Retry-After seconds sent with 429/503      (default 10)
+#   PUSH_RESERVED       slots only interactive deliveries may use  (default PUSH_THREADS // 4)
+# Saturation of one type's cap, or of the non-interactive share → 429; whole pool full → 503.
+# The lane is the message's `priority` attribute; messages without one count as interactive.
+# Shutdown: uvicorn stops accepting and waits up to --timeout-graceful-shutdown (set from
+# DRAIN_GRACE_SECONDS in the Dockerfile, default 8 s) for in-flight deliveries; drain()
+# then refuses anything else and reports handlers that outlived their request.
+# Threads, not processes: handlers share module-level gRPC clients, which don't survive
+# pickling; CPU-heavy work (image variants) already has its own process pool.
+from __future__ import annotations
+
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+THREADS = int(os.getenv("PUSH_THREADS", "16"))
+QUEUE = int(os.getenv("PUSH_QUEUE", "0"))
+RETRY_AFTER = int(os.getenv("PUSH_RETRY_AFTER", "10"))
+RESERVED = int(os.getenv("PUSH_RESERVED") or THREADS // 4)
+INTERACTIVE = "interactive"
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits: Dict[str, int] = {}
+    for part in spec.split(","):
+        name, _, n = part.partition("=")
+        if name.strip() and n.strip():
+            limits[name.strip()] = int(n)
+    return limits
+
+
+LIMITS = _parse_limits(os.getenv("PUSH_LIMITS", ""))
+
+
+class Saturated(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class HandlerPool:
+    """
+    A slot is taken on admission and given back when the handler actually finishes (on
+    its thread), or when it is cancelled before a thread picked it up — not when the
+    request goes away, so a disconnected client can't free a slot its handler still
+    occupies. Counters are shared with handler threads, hence the lock.
+    """
+
+    def __init__(self, threads: int = THREADS, queue: int = QUEUE, limits: Dict[str, int] = LIMITS,
+                 reserved: int = RESERVED):
+        self.capacity = threads + queue
+        self.reserved = min(reserved, self.capacity - 1)
+        self.limits = dict(limits)
+        self.in_flight = 0
+        self.by_type: Dict[str, int] = {}
+        self.by_lane: Dict[str, int] = {}
+        self.rejected = {"429": 0, "503": 0}
+        self.draining = False
+        self.running = 0       # handlers executing on a thread; outlives a cancelled request
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="push-handler")
+
+    def _admit(self, event_type: str, lane: str) -> None:
+        with self._lock:
+            self._admit_locked(event_type, lane)
+
+    def _admit_locked(self, event_type: str, lane: str) -> None:
+        if self.draining:
+            self.rejected["503"] += 1
+            raise Saturated(503, "worker shutting down")
+        if self.in_flight >= self.capacity:
+            self.rejected["503"] += 1
+            raise Saturated(503, f"worker saturated ({self.in_flight}/{self.capacity} in flight)")
+        if lane != INTERACTIVE and self.in_flight >= self.capacity - self.reserved:
+            self.rejected["429"] += 1
+            raise Saturated(429, f"{lane} lane at its share ({self.reserved} slots reserved for interactive)")
+        limit = self.limits.get(event_type)
+        if limit is not None and self.by_type.get(event_type, 0) >= limit:
+            self.rejected["429"] += 1
+            raise Saturated(429, f"{event_type} at its concurrency limit ({limit})")
+        self.in_flight += 1
+        self.by_type[event_type] = self.by_type.get(event_type, 0) + 1
+        self.by_lane[lane] = self.by_lane.get(lane, 0) + 1
+
+    def _release(self, event_type: str, lane: str) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.by_type[event_type] -= 1
+            self.by_lane[lane] -= 1
+
+    async def run(self, event_type: str, fn: Callable[..., Any], *args, lane: str = INTERACTIVE) -> Any:
+        """Run fn(*args) on the pool, or raise Saturated without queuing."""
+        self._admit(event_type, lane)
+        try:
+            future = self._executor.submit(self._call, event_type, lane, fn, *args)
+        except RuntimeError:        # executor already shut down by drain()
+            self._release(event_type, lane)
+            raise Saturated(503, "worker shutting down")
+        # never started (dropped by drain, or the request was cancelled while queued)
+        future.add_done_callback(lambda f: f.cancelled() and self._release(event_type, lane))
+        return await asyncio.wrap_future(future)
+
+    def _call(self, event_type: str, lane: str, fn: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+            self._release(event_type, lane)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "running": self.running,
+                "draining": self.draining,
+                "capacity": self.capacity,
+                "by_type": {k: v for k, v in self.by_type.items() if v},
+                "by_lane": {k: v for k, v in self.by_lane.items() if v},
+                "reserved_interactive": self.reserved,
+                "limits": self.limits,
+                "rejected": dict(self.rejected),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        Refuse new deliveries, drop queued ones and report what is still running. Those
+        handlers lost their HTTP request, so Pub/Sub redelivers them; one that finishes
+        first is recorded by utils/idempotency and its redelivery is acked without work.
+        """
+        self.draining = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return {"abandoned_running": self.running, "rejected": dict(self.rejected)}
@@ -0,0 +1,203 @@
+# Worker/src/utils/idempotency.py
+# Consumer-side dedupe for redelivered events, keyed on the envelope's idempotency_key
+# (logical request) or else its event_id (one publish).
+#   - Front: in-process LRU of keys already completed here (no round trip on hot redeliveries).
+#   - Back:  processed_events/{sha256(key)} in Firestore, claimed with create() so exactly one
+#            worker wins; {status: processing|done, lease_until, expire_at}.
+#            A "processing" claim whose lease has lapsed (crashed worker) can be taken over.
+#            expire_at is the TTL field — enable the policy once:
+#              gcloud firestore fields ttls update expire_at --collection-group=processed_events --enable-ttl
+#   IDEMPOTENCY_ENABLED (true) · IDEMPOTENCY_TTL_HOURS (72) · IDEMPOTENCY_LEASE_SECONDS (600)
+#   IDEMPOTENCY_LRU_SIZE (10000) · IDEMPOTENCY_COLLECTION (processed_events)
+from __future__ import annotations
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from google.api_core.exceptions import AlreadyExists, Conflict, FailedPrecondition
+from google.cloud import firestore
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+
+ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").strip().lower() in {"1", "true", "yes", "y"}
+COLLECTION = os.getenv("IDEMPOTENCY_COLLECTION", "processed_events")
+TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "72")))
+LEASE = timedelta(seconds=float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "600")))
+LRU_SIZE = int(os.getenv("IDEMPOTENCY_LRU_SIZE", "10000"))
+
+db = firestore.Client()
+
+# claim outcomes
+CLAIMED = "claimed"        # process it
+DUPLICATE = "duplicate"    # already done: ack without work
+IN_FLIGHT = "in_flight"    # another worker holds a live lease: retry later
+
+
+class InFlight(Exception):
+    """The event is being processed elsewhere; nack/redeliver instead of duplicating work."""
+
+
+class _LRU:
+    def __init__(self, size: int):
+        self._size = size
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return True
+            return False
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self._size:
+                self._keys.popitem(last=False)
+
+
+_done = _LRU(LRU_SIZE)
+
+
+def key_for(payload: Dict[str, Any], attrs: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """"<type>:<idempotency_key or event_id>" (scoped by type so keys can't collide across handlers)."""
+    attrs = attrs or {}
+    raw = (payload.get("idempotency_key") or attrs.get("idempotency_key")
+           or payload.get("event_id") or attrs.get("event_id"))
+    return f"{payload.get('type') or attrs.get('type') or ''}:{raw}" if raw else None
+
+
+def _ref(key: str):
+    return db.collection(COLLECTION).document(hashlib.sha256(key.encode()).hexdigest())
+
+
+def _claim_doc(key: str, event_type: Optional[str], now: datetime) -> Dict[str, Any]:
+    return {
+        "key": key,
+        "type": event_type,
+        "status": "processing",
+        "claimed_at": SERVER_TIMESTAMP,
+        "lease_until": now + LEASE,
+        "expire_at": now + LEASE + TTL,
+    }
+
+
+def _resolve_existing(key: str, event_type: Optional[str], snap, now: datetime) -> str:
+    data = snap.to_dict() or {}
+    if data.get("status") == "done":
+        _done.add(key)
+        return DUPLICATE
+    lease_until = data.get("lease_until")
+    if lease_until is not None and lease_until > now:
+        return IN_FLIGHT
+    # stale claim from a worker that never finished: take it over, unless someone beat us to it
+    try:
+        snap.reference.update(_claim_doc(key, event_type, now),
+                              option=db.write_option(last_update_time=snap.update_time))
+        return CLAIMED
+    except (FailedPrecondition, Conflict):
+        return IN_FLIGHT
+
+
+def claim_many(keys: List[str], event_type: Optional[str] = None) -> Dict[str, str]:
+    """
+    Claim several keys with two round trips in the common case: one get_all, then one
+    batch of create()s. Returns {key: CLAIMED | DUPLICATE | IN_FLIGHT}.
+    """
+    out: Dict[str, str] = {}
+    todo = []
+    for k in dict.fromkeys(keys):
+        if k in _done:
+            out[k] = DUPLICATE
+        else:
+            todo.append(k)
+    if not todo:
+        return out
+
+    now = datetime.now(timezone.utc)
+    refs = {k: _ref(k) for k in todo}
+    by_id = {r.id: k for k, r in refs.items()}
+    fresh = []
+    for snap in db.get_all(list(refs.values())):
+        k = by_id[snap.id]
+        if snap.exists:
+            out[k] = _resolve_existing(k, event_type, snap, now)
+        else:
+            fresh.append(k)
+
+    if fresh:
+        batch = db.batch()
+        for k in fresh:
+            batch.create(refs[k], _claim_doc(k, event_type, now))
+        try:
+            batch.commit()
+            out.update({k: CLAIMED for k in fresh})
+        except (AlreadyExists, Conflict):
+            for k in fresh:            # lost a race on at least one: settle them one by one
+                out[k] = claim(k, event_type)
+    return out
+
+
+def claim(key: str, event_type: Optional[str] = None) -> str:
+    if key in _done:
+        return DUPLICATE
+    now = datetime.now(timezone.utc)
+    ref = _ref(key)
+    try:
+        ref.create(_claim_doc(key, event_type, now))
+        return CLAIMED
+    except (AlreadyExists, Conflict):
+        return _resolve_existing(key, event_type, ref.get(), now)
+
+
+def complete_many(keys: List[str]) -> None:
+    """Mark keys done (kept until expire_at) in batches of ≤500."""
+    now = datetime.now(timezone.utc)
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), 500):
+        batch = db.batch()
+        for k in keys[start:start + 500]:
+            batch.set(_ref(k), {"key": k, "status": "done", "done_at": SERVER_TIMESTAMP,
+                                "expire_at": now + TTL}, merge=True)
+        batch.commit()
+    for k in keys:
+        _done.add(k)
+
+
+def release_many(keys: List[str]) -> None:
+    """Drop claims for work that failed so a redelivery can retry it."""
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), 500):
+        batch = db.batch()
+        for k in keys[start:start + 500]:
+            batch.delete(_ref(k))
+        batch.commit()
+
+
+def run_once(payload: Dict[str, Any], fn: Callable[[Dict[str, Any]], Any],
+             attrs: Optional[Dict[str, str]] = None) -> Any:
+    """
+    fn(payload) at most once per key (per TTL). Duplicates return None without calling fn;
+    raises InFlight while another worker holds the claim. Keyless payloads just run.
+    """
+    key = key_for(payload, attrs) if ENABLED else None
+    if key is None:
+        return fn(payload)
+    state = claim(key, payload.get("type"))
+    if state == DUPLICATE:
+        print(f"[idempotency] skipping duplicate {payload.get('type')} {key}")
+        return None
+    if state == IN_FLIGHT:
+        raise InFlight(key)
+    try:
+        result = fn(payload)
+    except BaseException:
+        release_many([key])
+        raise
+    complete_many([key])
+    return result
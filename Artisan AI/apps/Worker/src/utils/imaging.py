@@ -0,0 +1,69 @@
+# Worker/src/utils/imaging.py
+# Pure-Pillow rendering helpers. Kept free of GCP clients so it is cheap to import
+# in ProcessPoolExecutor children (spawned interpreters only import this module).
+from __future__ import annotations
+
+import io
+from typing import Dict, List, Sequence, Tuple
+
+from PIL import Image, ImageOps, features
+
+# Encoder settings per output format (quality tuned for product photos)
+_ENCODE: Dict[str, Dict] = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 55, "speed": 6},
+}
+
+
+def supported_formats(wanted: Sequence[str]) -> List[str]:
+    """Drop formats this Pillow build cannot encode (AVIF needs libavif, Pillow ≥ 11.2)."""
+    out = []
+    for fmt in wanted:
+        try:
+            if fmt in _ENCODE and features.check(fmt):
+                out.append(fmt)
+        except Exception:
+            pass
+    return out
+
+
+def _target_widths(width: int, sizes: Sequence[int]) -> List[int]:
+    """Never upscale; an image narrower than every size still gets one variant at its own width."""
+    widths = sorted({w for w in sizes if w < width})
+    return widths or [width]
+
+
+def render_variants(
+    data: bytes,
+    sizes: Sequence[int],
+    formats: Sequence[str],
+) -> Tuple[int, int, List[Tuple[int, int, str, bytes]]]:
+    """
+    Decode once, resize to each width (aspect kept) and encode each format.
+    Returns (orig_width, orig_height, [(width, height, format, bytes), ...]).
+    Runs in a worker process — arguments and results must be picklable.
+    """
+    img = Image.open(io.BytesIO(data))
+    orig_w, orig_h = img.size
+    rotated = img.getexif().get(0x0112) in (5, 6, 7, 8)   # EXIF orientation rotates by 90°
+    if rotated:
+        orig_w, orig_h = orig_h, orig_w
+    widths = _target_widths(orig_w, sizes)
+    # JPEG: let libjpeg decode at a reduced scale when the largest variant allows it.
+    # draft() works on the stored (pre-rotation) pixels, so ask in that orientation.
+    want = (max(widths), -(-max(widths) * orig_h // max(orig_w, 1)))
+    img.draft("RGB", want[::-1] if rotated else want)
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "P") else "RGB")
+
+    out: List[Tuple[int, int, str, bytes]] = []
+    for w in sorted(widths, reverse=True):
+        h = max(1, round(orig_h * w / orig_w))
+        # resize from the previous (larger) step: cheaper and visually equivalent
+        img = img.resize((w, h), Image.Resampling.LANCZOS, reducing_gap=3.0) if img.width != w else img
+        for fmt in formats:
+            buf = io.BytesIO()
+            img.save(buf, **_ENCODE[fmt])
+            out.append((w, h, fmt, buf.getvalue()))
+    return orig_w, orig_h, out
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import os
 import sys
+import gzip
 import json
 import uuid
 from typing import Tuple, Optional
@@ -19,6 +20,9 @@ BUCKET_ENV = os.getenv("GCS_BUCKET")
 
 _client = storage.Client(project=PROJECT)
 
+# Text artifacts are stored with Content-Encoding: gzip (GCS transcodes for plain clients)
+GZIP_MIN_BYTES = int(os.getenv("STORAGE_GZIP_MIN_BYTES", "1024"))
+
 def _ensure_bucket_or_die() -> storage.Bucket:
     if not BUCKET_ENV:
         raise SystemExit("[worker.storage] GCS_BUCKET not set")
@@ -72,32 +76,65 @@ def write_text(gs_or_key: str, text: str, *, content_type: str = "text/markdown"
     """
     bucket, key = _parse_gs_uri(gs_or_key)
     blob = bucket.blob(key)
-    blob.upload_from_string(text, content_type=content_type)
+    data = text.encode("utf-8")
+    if len(data) >= GZIP_MIN_BYTES:
+        blob.content_encoding = "gzip"
+        data = gzip.compress(data, compresslevel=9, mtime=0)   # mtime=0 → deterministic bytes
+    blob.upload_from_string(data, content_type=content_type)
     return _normalize_uri(bucket, key)
 
 def write_json(gs_or_key: str, obj, *, indent: Optional[int] = None) -> str:
     data = json.dumps(obj, ensure_ascii=False, indent=indent)
     return write_text(gs_or_key, data, content_type="application/json; charset=utf-8")
 
-def write_bytes(gs_or_key: str, data: bytes, *, content_type: Optional[str] = None) -> str:
+def write_bytes(
+    gs_or_key: str,
+    data: bytes,
+    *,
+    content_type: Optional[str] = None,
+    cache_control: Optional[str] = None,
+) -> str:
     bucket, key = _parse_gs_uri(gs_or_key)
     blob = bucket.blob(key)
     if content_type:
         blob.content_type = content_type
+    if cache_control:
+        blob.cache_control = cache_control
     blob.upload_from_string(data)
     return _normalize_uri(bucket, key)
 
-def read_text(gs_uri: str) -> str:
+def read_bytes(gs_uri: str) -> bytes:
     bucket, key = _parse_gs_uri(gs_uri)
     blob = bucket.blob(key)
     if not blob.exists():
         raise NotFound(f"GCS object not found: {gs_uri}")
-    return blob.download_as_text()
+    return blob.download_as_bytes()
+
+def public_url(gs_uri: str) -> str:
+    """Browser URL for an object (bucket must allow public read, same as the API's public_url)."""
+    bucket, key = _parse_gs_uri(gs_uri)
+    return f"https://storage.googleapis.com/{bucket.name}/{key}"
+
+def read_text(gs_uri: str) -> str:
+    """Works for plain and gzip-encoded objects alike."""
+    bucket, key = _parse_gs_uri(gs_uri)
+    blob = bucket.get_blob(key)
+    if blob is None:
+        raise NotFound(f"GCS object not found: {gs_uri}")
+    data = blob.download_as_bytes()   # the client decodes Content-Encoding: gzip itself …
+    if blob.content_encoding == "gzip" and data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)  # … unless the payload came back still compressed
+    return data.decode("utf-8")
 
 def exists(gs_uri: str) -> bool:
     bucket, key = _parse_gs_uri(gs_uri)
     return bucket.blob(key).exists()
 
+def uri(gs_or_key: str) -> str:
+    """Normalized gs:// URI for a key or URI (no request)."""
+    bucket, key = _parse_gs_uri(gs_or_key)
+    return _normalize_uri(bucket, key)
+
 # Convenience: allocate a new unique key under a prefix in the default bucket.
 def new_key(prefix: str, *, ext: Optional[str] = None) -> str:
     key = _pick_key(prefix, ext)
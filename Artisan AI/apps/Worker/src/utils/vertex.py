@@ -2,3 +2,13 @@ def generate_description(product: dict, tone: str, lang: str) -> str:
     title = product.get("title", "Handcrafted Item")
     materials = ", ".join(product.get("materials", []))
     return f"# {title} ({lang}, {tone})\n\nMaterials: {materials}\n\nA lovingly crafted piece..."
+
+
+def generate_post_texts(model: str, items: list) -> list:
+    """
+    Social copy for a group of (product, product_id, lang, channel) sharing one model:
+    one call per group, one text per item, in order. MVP: template copy, so `model`
+    is only the grouping key until a batch prediction request replaces this body.
+    """
+    return [f"Discover handcrafted beauty from {product.get('title', product_id)} ✨"
+            for product, product_id, _lang, _channel in items]
@@ -20,9 +20,22 @@ class Settings(BaseSettings):
     # ---- Buckets ----
     gcs_bucket: str = Field("", env="GCS_BUCKET")
 
+    # ---- Uploads ----
+    upload_max_bytes: int = Field(20 * 1024 * 1024, env="UPLOAD_MAX_BYTES")
+
     # ---- Pub/Sub topics ----
     pubsub_topic_content: str = Field("content.requested", env="PUBSUB_TOPIC_CONTENT")
     pubsub_topic_marketing: str = Field("marketing.asset.requested", env="PUBSUB_TOPIC_MARKETING")
+    pubsub_topic_media: str = Field("media.uploaded", env="PUBSUB_TOPIC_MEDIA")
+    pubsub_batch_max_messages: int = Field(100, env="PUBSUB_BATCH_MAX_MESSAGES")
+    pubsub_batch_max_bytes: int = Field(1024 * 1024, env="PUBSUB_BATCH_MAX_BYTES")
+    pubsub_batch_max_latency_ms: int = Field(10, env="PUBSUB_BATCH_MAX_LATENCY_MS")
+    pubsub_retry_buffer_size: int = Field(1000, env="PUBSUB_RETRY_BUFFER_SIZE")
+
+    # ---- Event bus (pubsub | memory | file) ----
+    event_bus: str = Field("pubsub", env="EVENT_BUS")
+    event_log_dir: str = Field("/tmp/artisan-events", env="EVENT_LOG_DIR")
+    event_encoding: str = Field("msgpack", env="EVENT_ENCODING")   # msgpack | json
 
     # Back-compat (old env names)
     TOPIC_CONTENT_REQUESTED: str = Field("content.requested", env="TOPIC_CONTENT_REQUESTED")
@@ -33,6 +46,25 @@ class Settings(BaseSettings):
     firestore_collection_stories: str = Field("stories", env="FIRESTORE_COLL_STORIES")
     firestore_collection_marketing: str = Field("marketing_assets", env="FIRESTORE_COLL_MARKETING")
 
+    # ---- Storefront ----
+    store_cache_ttl_seconds: int = Field(30, env="STORE_CACHE_TTL_SECONDS")
+    store_cache_max_entries: int = Field(512, env="STORE_CACHE_MAX_ENTRIES")
+    store_stats_max_age_seconds: int = Field(600, env="STORE_STATS_MAX_AGE_SECONDS")
+
+    # ---- Stories ----
+    story_html_cache_entries: int = Field(1024, env="STORY_HTML_CACHE_ENTRIES")
+
+    # ---- Outbox relay ----
+    outbox_relay_batch_size: int = Field(500, env="OUTBOX_RELAY_BATCH_SIZE")
+    outbox_relay_interval_seconds: float = Field(2.0, env="OUTBOX_RELAY_INTERVAL_SECONDS")
+    outbox_max_attempts: int = Field(10, env="OUTBOX_MAX_ATTEMPTS")
+    outbox_relay_in_api: bool = Field(True, env="OUTBOX_RELAY_IN_API")
+
+    # ---- Bulk catalog import ----
+    import_initial_ops_per_second: int = Field(500, env="IMPORT_INITIAL_OPS_PER_SECOND")
+    import_max_ops_per_second: int = Field(10000, env="IMPORT_MAX_OPS_PER_SECOND")
+    import_checkpoint_every: int = Field(1000, env="IMPORT_CHECKPOINT_EVERY")
+
     # ---- Vertex AI (Gemini) ----
     vertex_model: str = Field("gemini-1.5-pro", env="VERTEX_MODEL")
 
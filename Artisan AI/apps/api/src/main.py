@@ -7,9 +7,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.config import get_settings
+from .repos import pubsub
+from .services import outbox_relay
 
 # Routers (they already include their own /v1/... prefixes & tags)
-from .v1.endpoints import products, marketing, recs, uploads  # <-- added uploads
+from .v1.endpoints import products, marketing, recs, uploads, stores, media, stories
 
 # ---- App init ----
 settings = get_settings()
@@ -37,6 +39,25 @@ app.include_router(products.router)
 app.include_router(marketing.router)
 app.include_router(recs.router)
 app.include_router(uploads.router)  # <-- register uploads endpoints
+app.include_router(stores.router)
+app.include_router(stories.router)
+app.include_router(media.router)    # /static/* for locally stored files
+
+# ---- Outbox relay: publishes events staged with domain writes (services/outbox_relay.py) ----
+_relay_stop = None
+
+@app.on_event("startup")
+def _start_outbox_relay():
+    global _relay_stop
+    if settings.outbox_relay_in_api:
+        _relay_stop = outbox_relay.start_background()
+
+# ---- Shutdown: send batched/queued Pub/Sub messages before exit ----
+@app.on_event("shutdown")
+def _flush_pubsub():
+    if _relay_stop is not None:
+        _relay_stop.set()
+    pubsub.flush()
 
 # ---- Health/Liveness/Readiness ----
 @app.get("/healthz")
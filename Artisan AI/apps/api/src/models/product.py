@@ -25,7 +25,7 @@ class ProductIn(BaseModel):
     region: Optional[str] = Field(None, description="e.g., Saharanpur, Kutch, Channapatna")
     attributes: Dict[str, str] = Field(default_factory=dict, description="size, color, pattern, finish")
 
-    # NOTE: strings (not HttpUrl) so we can accept data URLs and coerce relatives
+    # NOTE: strings (not HttpUrl) so we can coerce relatives; binary data is uploaded separately
     images: List[str] = Field(default_factory=list)
 
     artisan_id: Optional[str] = None
@@ -57,7 +57,7 @@ class ProductIn(BaseModel):
     def _images_to_absolute(cls, v):
         """
         Accepts list/tuple/set/str.
-        - Keep data:image/... values (endpoint may ingest them).
+        - Reject data: URIs (upload via POST /v1/uploads/images and send the URL).
         - Convert relative or placeholder-y values to absolute HTTP URLs via storage.public_url(...).
         """
         if not v:
@@ -73,10 +73,8 @@ class ProductIn(BaseModel):
             if not s:
                 continue
 
-            # data URLs allowed (ingested later by endpoint)
-            if s.startswith("data:image/"):
-                out.append(s)
-                continue
+            if s.startswith("data:"):
+                raise ValueError("inline data URIs are not accepted; upload the image and send its URL")
 
             # already absolute
             if s.startswith("http://") or s.startswith("https://"):
@@ -145,3 +143,27 @@ class QuickTextResponse(BaseModel):
     description: Optional[str] = None
     story: Optional[str] = None
     used_fields: Dict[str, Any] = Field(default_factory=dict)
+
+
+# ---- Bulk PATCH ----
+class BulkPatchItem(BaseModel):
+    id: str = Field(..., min_length=1)
+    patch: Dict[str, Any] = Field(default_factory=dict)
+
+
+class BulkPatchFilter(BaseModel):
+    """Equality filters; all given fields must match."""
+    category: Optional[str] = None
+    artisan_id: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
+class BulkPatchRequest(BaseModel):
+    """
+    Either `items` (per-id patches) or `filter` + `patch` (same patch for every match).
+    e.g. {"filter": {"category": "pottery"}, "patch": {"is_active": false}}
+    """
+    items: Optional[List[BulkPatchItem]] = Field(default=None, max_length=10_000)
+    filter: Optional[BulkPatchFilter] = None
+    patch: Optional[Dict[str, Any]] = None
+
@@ -0,0 +1,169 @@
+# apps/api/src/repos/eventbus.py
+# Event bus backends behind repos/pubsub.py. Selected by EVENT_BUS:
+#   - "pubsub" (default): Google Cloud Pub/Sub, client-side batching (imported lazily)
+#   - "memory": in-process asyncio queues, one per topic — single-process runs and benchmarks
+#   - "file":   append-only JSON-lines log per topic under EVENT_LOG_DIR; the worker's
+#               consumers/local_bus.py tails it, so API and worker run offline on one machine
+# Every backend exposes send(topic, data, attrs) -> concurrent Future[message_id] and stop().
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from ..core.config import get_settings
+
+_settings = get_settings()
+
+
+def _done(message_id: str) -> Future:
+    f: Future = Future()
+    f.set_result(message_id)
+    return f
+
+
+# -------------------------------------------------------------------
+# Google Cloud Pub/Sub
+# -------------------------------------------------------------------
+class PubSubBus:
+    """
+    Messages are batched client-side: a batch is sent when it reaches max_messages or
+    max_bytes, or max_latency after its first message — whichever comes first.
+    """
+
+    def __init__(self):
+        from google.cloud import pubsub_v1   # only this backend needs the client library
+
+        self._publisher = pubsub_v1.PublisherClient(
+            batch_settings=pubsub_v1.types.BatchSettings(
+                max_messages=_settings.pubsub_batch_max_messages,
+                max_bytes=_settings.pubsub_batch_max_bytes,
+                max_latency=_settings.pubsub_batch_max_latency_ms / 1000.0,
+            ),
+        )
+        self._topics: Dict[str, str] = {}
+
+    def _topic_path(self, topic: str) -> str:
+        """Memoize topic path resolution."""
+        if topic not in self._topics:
+            self._topics[topic] = self._publisher.topic_path(_settings.gcp_project, topic)
+        return self._topics[topic]
+
+    def send(self, topic: str, data: bytes, attrs: Dict[str, str]) -> Future:
+        return self._publisher.publish(self._topic_path(topic), data, **attrs)
+
+    def stop(self) -> None:
+        self._publisher.stop()   # flushes open batches and waits for them
+
+
+# -------------------------------------------------------------------
+# In-process (asyncio queues)
+# -------------------------------------------------------------------
+Message = Tuple[str, bytes, Dict[str, str]]   # (message_id, data, attrs)
+
+
+class MemoryBus:
+    """
+    One asyncio.Queue per topic, owned by the subscriber's event loop. send() is safe from
+    any thread (sync endpoints run on the threadpool); messages published before a topic
+    is subscribed are held and handed over on subscribe(). Nothing survives the process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = {}
+        self._held: Dict[str, Deque[Message]] = {}
+
+    def send(self, topic: str, data: bytes, attrs: Dict[str, str]) -> Future:
+        msg: Message = (uuid.uuid4().hex, data, dict(attrs))
+        with self._lock:
+            target = self._queues.get(topic)
+            if target is not None and target[0].is_closed():   # subscriber's loop is gone
+                del self._queues[topic]
+                target = None
+            if target is None:
+                self._held.setdefault(topic, deque()).append(msg)
+                return _done(msg[0])
+        loop, queue = target
+        loop.call_soon_threadsafe(queue.put_nowait, msg)
+        return _done(msg[0])
+
+    def subscribe(self, topic: str) -> asyncio.Queue:
+        """Queue of (message_id, data, attrs) for `topic`; call from the consuming loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if topic not in self._queues:
+                queue: asyncio.Queue = asyncio.Queue()
+                for msg in self._held.pop(topic, ()):
+                    queue.put_nowait(msg)
+                self._queues[topic] = (loop, queue)
+            return self._queues[topic][1]
+
+    def stop(self) -> None:
+        pass
+
+
+# -------------------------------------------------------------------
+# File-backed log
+# -------------------------------------------------------------------
+class FileBus:
+    """
+    {EVENT_LOG_DIR}/{topic}.jsonl, one record per line:
+        {"id": "<topic>:<byte offset>", "ts": <unix>, "attrs": {...}, "data": "<base64>"}
+    Appends are serialized per process and flushed (no fsync); the message id is the
+    record's byte offset, which is also what readers checkpoint.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._dir = Path(directory or _settings.event_log_dir)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._files: Dict[str, Any] = {}
+
+    def send(self, topic: str, data: bytes, attrs: Dict[str, str]) -> Future:
+        with self._lock:
+            f = self._files.get(topic)
+            if f is None:
+                f = self._files[topic] = open(self._dir / f"{topic}.jsonl", "ab")
+            message_id = f"{topic}:{f.tell()}"
+            record = {"id": message_id, "ts": time.time(), "attrs": attrs,
+                      "data": base64.b64encode(data).decode("ascii")}
+            f.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+            f.flush()
+        return _done(message_id)
+
+    def stop(self) -> None:
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+
+# -------------------------------------------------------------------
+# Selection
+# -------------------------------------------------------------------
+BACKENDS = {"pubsub": PubSubBus, "memory": MemoryBus, "file": FileBus}
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    """Process-wide bus for EVENT_BUS, created on first use."""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                name = (_settings.event_bus or "pubsub").strip().lower()
+                if name not in BACKENDS:
+                    raise ValueError(f"EVENT_BUS must be one of {sorted(BACKENDS)}, got {name!r}")
+                _bus = BACKENDS[name]()
+    return _bus
@@ -2,17 +2,20 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 from google.api_core.retry import Retry
 from google.api_core import exceptions as gexc
 from google.api_core.exceptions import FailedPrecondition, InvalidArgument
 from google.cloud import firestore
-from google.cloud.firestore_v1 import SERVER_TIMESTAMP, Increment
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP, Increment, _helpers
+from google.cloud.firestore_v1.bulk_writer import BulkWriter, BulkWriterOptions, SendMode
+from google.cloud.firestore_v1.field_path import FieldPath
 from google.oauth2 import service_account
 
 from ..core.config import get_settings
+from .event_codec import encode
 
 # -------------------------------------------------------------------
 # Client bootstrap
@@ -49,9 +52,15 @@ COLL_MARKETING = _settings.firestore_collection_marketing      # "marketing_asse
 COLL_ORDERS    = "orders"
 COLL_STORES    = "stores"
 COLL_USERS     = "users"
+COLL_IMPORTS   = "imports"
+COLL_MEDIA     = "media"
+OUTBOX         = "outbox"          # subcollection under the domain doc an event belongs to
 
 RETRY = Retry(deadline=10.0)
 
+# (topic, envelope, message attributes) — staged in an outbox, published by the relay
+OutboxEvent = Tuple[str, Dict[str, Any], Dict[str, str]]
+
 # -------------------------------------------------------------------
 # Utils
 # -------------------------------------------------------------------
@@ -105,23 +114,132 @@ def _to_firestore(v: Any) -> Any:
 # -------------------------------------------------------------------
 # PRODUCTS
 # -------------------------------------------------------------------
-def save_product(product_id: str, doc: Dict[str, Any]) -> None:
-    """
-    Create/merge a product (idempotent).
-    Defaults new docs to is_active=True and stamps server timestamps.
-    """
+def _product_payload(product_id: str, doc: Dict[str, Any]) -> Dict[str, Any]:
     data = {**doc}
     data.setdefault("id", product_id)
     data.setdefault("is_active", True)
     data.setdefault("created_at", SERVER_TIMESTAMP)
     data["updated_at"] = SERVER_TIMESTAMP
-    data = _to_firestore(data)  # ← sanitize before write
+    return _to_firestore(data)  # ← sanitize before write
+
+def save_product(product_id: str, doc: Dict[str, Any]) -> None:
+    """
+    Create/merge a product (idempotent).
+    Defaults new docs to is_active=True and stamps server timestamps.
+    """
+    data = _product_payload(product_id, doc)
     _db.collection(COLL_PRODUCTS).document(product_id).set(data, merge=True, retry=RETRY)
 
-def update_product_fields(product_id: str, patch: Dict[str, Any]) -> None:
+def _merge_paths(data: Dict[str, Any], prefix: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """
+    Flatten nested maps into field paths so update() deep-merges the way
+    set(merge=True) does (update() would otherwise replace whole map fields).
+    Empty maps are kept as values; keys are quoted, so dots in keys stay literal.
+    """
+    out: Dict[str, Any] = {}
+    for k, v in data.items():
+        parts = prefix + (str(k),)
+        if isinstance(v, dict) and v:
+            out.update(_merge_paths(v, parts))
+        else:
+            out[FieldPath(*parts).to_api_repr()] = v
+    return out
+
+def update_product_fields(product_id: str, patch: Dict[str, Any], *, must_exist: bool = False) -> bool:
+    """
+    Merge `patch` into a product.
+    must_exist=True sends an update() (server-side exists precondition) instead of a
+    merge-set, so a missing product is reported as False without a separate read.
+    """
     payload = _with_timestamps(patch, new=False)
     payload = _to_firestore(payload)  # ← sanitize
-    _db.collection(COLL_PRODUCTS).document(product_id).set(payload, merge=True, retry=RETRY)
+    ref = _db.collection(COLL_PRODUCTS).document(product_id)
+    if not must_exist:
+        ref.set(payload, merge=True, retry=RETRY)
+        return True
+    try:
+        ref.update(_merge_paths(payload), retry=RETRY)
+    except gexc.NotFound:
+        return False
+    return True
+
+def product_exists(product_id: str) -> bool:
+    """Existence check that transfers a single field instead of the whole doc."""
+    ref = _db.collection(COLL_PRODUCTS).document(product_id)
+    snap = next(iter(_db.get_all([ref], field_paths=["id"], retry=RETRY)), None)
+    return bool(snap and snap.exists)
+
+# Firestore caps a single commit at 500 writes.
+MAX_BATCH_WRITES = 500
+
+def _existing_product_ids(product_ids: List[str]) -> set:
+    """One batched get_all (masked to a single field) instead of N full reads."""
+    refs = [_db.collection(COLL_PRODUCTS).document(pid) for pid in dict.fromkeys(product_ids)]
+    return {snap.id for snap in _db.get_all(refs, field_paths=["id"], retry=RETRY) if snap.exists}
+
+def iter_product_ids(
+    category: Optional[str] = None,
+    artisan_id: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    page_size: int = 1000,
+) -> Iterator[str]:
+    """Ids of products matching equality filters (projection on __name__ only)."""
+    q = _db.collection(COLL_PRODUCTS)
+    if category:
+        q = q.where("category", "==", category)
+    if artisan_id:
+        q = q.where("artisan_id", "==", artisan_id)
+    if is_active is not None:
+        q = q.where("is_active", "==", is_active)
+    q = q.select([FieldPath.document_id()]).order_by(FieldPath.document_id())
+
+    last = None
+    while True:
+        page = q.start_after(last) if last is not None else q
+        n = 0
+        for snap in page.limit(page_size).stream(retry=RETRY):
+            n += 1
+            last = snap
+            yield snap.id
+        if n < page_size:
+            return
+
+def batch_update_products(
+    updates: List[Tuple[str, Dict[str, Any]]],
+    *,
+    check_exists: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Apply many (product_id, patch) merges as WriteBatch commits of ≤500 writes.
+    Missing products are reported instead of created. A failed commit marks only
+    the items of that chunk. Returns [{"id", "ok", "error"?}] in input order.
+    """
+    results: List[Dict[str, Any]] = []
+    for i in range(0, len(updates), MAX_BATCH_WRITES):
+        chunk = updates[i:i + MAX_BATCH_WRITES]
+        existing = _existing_product_ids([pid for pid, _ in chunk]) if check_exists else None
+
+        batch = _db.batch()
+        staged: List[Dict[str, Any]] = []
+        chunk_results: List[Dict[str, Any]] = []
+        for pid, patch in chunk:
+            if existing is not None and pid not in existing:
+                chunk_results.append({"id": pid, "ok": False, "error": "product not found"})
+                continue
+            payload = _to_firestore(_with_timestamps(patch, new=False))
+            batch.set(_db.collection(COLL_PRODUCTS).document(pid), payload, merge=True)
+            item = {"id": pid, "ok": True}
+            staged.append(item)
+            chunk_results.append(item)
+
+        if staged:
+            try:
+                batch.commit(retry=RETRY)
+            except Exception as e:
+                for item in staged:
+                    item.update(ok=False, error=f"commit: {e}")
+        results.extend(chunk_results)
+    return results
 
 def get_product(product_id: str) -> Optional[Dict[str, Any]]:
     snap = _db.collection(COLL_PRODUCTS).document(product_id).get(retry=RETRY)
@@ -171,16 +289,106 @@ def list_products(
         next_cursor = (ts, last.id)
     return {"items": items, "next": next_cursor}
 
-def bump_popularity(product_id: str, delta: int = 1) -> int:
+def iter_products(
+    category: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    page_size: int = 500,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every matching product, one page at a time (constant memory).
+    Pages are keyset-ordered by document id, which needs no composite index, and
+    each page is a short query so a long export never hits the stream deadline.
+    The next page is only fetched once the caller has consumed the current one.
+    """
+    q = _db.collection(COLL_PRODUCTS)
+    if is_active is not None:
+        q = q.where("is_active", "==", is_active)
+    if category:
+        q = q.where("category", "==", category)
+    q = q.order_by(FieldPath.document_id())
+
+    last = None
+    while True:
+        page = q.start_after(last) if last is not None else q
+        n = 0
+        for snap in page.limit(page_size).stream(retry=RETRY):
+            n += 1
+            last = snap
+            yield snap.to_dict() | {"id": snap.id}
+        if n < page_size:
+            return
+
+def list_products_by_artisan(
+    artisan_id: str,
+    limit: int = 24,
+    cursor: Optional[Tuple[Any, str]] = None,
+    include_inactive: bool = False,
+) -> Dict[str, Any]:
+    """
+    Storefront listing backed by the (artisan_id ↑, created_at ↓) composite index.
+    Keyset pagination on (created_at desc, __name__ desc); the implicit document-id
+    tiebreaker follows the direction of the last order_by, so the same index serves it.
+    Returns {"items":[...], "next": (ts, id) | None}
+    """
+    col = _db.collection(COLL_PRODUCTS)
+    q = (col.where("artisan_id", "==", artisan_id)
+         .order_by("created_at", direction=firestore.Query.DESCENDING)
+         .order_by(FieldPath.document_id(), direction=firestore.Query.DESCENDING))
+    if cursor:
+        ts, doc_id = cursor
+        q = q.start_after({"created_at": ts, FieldPath.document_id(): col.document(doc_id)})
+
+    # inactive items are filtered client-side so the query stays on the declared index
+    items: List[Dict[str, Any]] = []
+    last, scanned = None, 0
+    for snap in q.limit(limit).stream():
+        last, scanned = snap, scanned + 1
+        d = snap.to_dict() | {"id": snap.id}
+        if include_inactive or d.get("is_active", True):
+            items.append(d)
+
+    next_cursor = None
+    if last is not None and scanned == limit:
+        next_cursor = (last.get("created_at"), last.id)
+    return {"items": items, "next": next_cursor}
+
+def bump_popularity(product_id: str, delta: int = 1) -> Optional[int]:
+    """
+    Atomically increment popularity in one RPC. The commit's transform_results carry
+    the post-increment value, so no follow-up get() is needed.
+    Returns None if the product does not exist (update() requires the doc).
+    retry=None disables the client's default Commit retry (ResourceExhausted /
+    ServiceUnavailable): an increment is not idempotent, and a commit that applied but
+    lost its response would be counted twice.
+    """
     ref = _db.collection(COLL_PRODUCTS).document(product_id)
-    ref.update({"popularity": Increment(int(delta)), "updated_at": SERVER_TIMESTAMP})
-    snap = ref.get()
-    return int(snap.get("popularity") or 0)
+    fields = {"popularity": Increment(int(delta)), "updated_at": SERVER_TIMESTAMP}
+    try:
+        result = ref.update(fields, retry=None)
+    except gexc.NotFound:
+        return None
+    # the client emits field transforms sorted by field path
+    idx = sorted(fields).index("popularity")
+    value = _helpers.decode_value(result.transform_results[idx], _db)
+    return int(value or 0)
 
 # -------------------------------------------------------------------
 # STORIES
 # -------------------------------------------------------------------
-def save_story(product_id: str, lang: str, data: Dict[str, Any]) -> None:
+def save_story(
+    product_id: str,
+    lang: str,
+    data: Dict[str, Any],
+    *,
+    skip_unchanged: bool = False,
+    events: Optional[List[OutboxEvent]] = None,
+) -> bool:
+    """
+    Upsert stories/{product_id}_{lang}. With skip_unchanged, the stored fields are read
+    first (masked get) and the write is skipped when they already match, so identical
+    regenerations don't bump updated_at or fire document triggers. Returns True if written.
+    `events` are committed to the story's outbox in the same batch (nothing if skipped).
+    """
     doc_id = f"{product_id}_{lang}"
     base = {
         "id": doc_id,
@@ -188,13 +396,29 @@ def save_story(product_id: str, lang: str, data: Dict[str, Any]) -> None:
         "lang": lang,
         "tone": data.get("tone", "narrative"),
         "gcs_uri": data.get("gcs_uri") or data.get("uri"),
+        "content_sha256": data.get("content_sha256"),
         "version": int(data.get("version", 1)),
         "approved": bool(data.get("approved", True)),
         "approved_by": data.get("approved_by"),
     }
+    ref = _db.collection(COLL_STORIES).document(doc_id)
+    if skip_unchanged and base["content_sha256"]:
+        snap = ref.get(field_paths=list(base), retry=RETRY)
+        if snap.exists and snap.to_dict() == base:
+            return False
     payload = _with_timestamps(base, new=True)
     payload = _to_firestore(payload)  # ← sanitize
-    _db.collection(COLL_STORIES).document(doc_id).set(payload, merge=True, retry=RETRY)
+    _set_with_events(ref, payload, events)
+    return True
+
+def get_story(product_id: str, lang: str) -> Optional[Dict[str, Any]]:
+    doc_id = f"{product_id}_{lang}"
+    snap = _db.collection(COLL_STORIES).document(doc_id).get(retry=RETRY)
+    if not snap.exists:
+        return None
+    data = snap.to_dict() or {}
+    data["id"] = doc_id
+    return data
 
 def list_stories(product_id: str, limit: int = 10) -> List[Dict[str, Any]]:
     q = (_db.collection(COLL_STORIES)
@@ -206,10 +430,10 @@ def list_stories(product_id: str, limit: int = 10) -> List[Dict[str, Any]]:
 # -------------------------------------------------------------------
 # MARKETING
 # -------------------------------------------------------------------
-def save_marketing_asset(key: str, data: Dict[str, Any]) -> None:
+def save_marketing_asset(key: str, data: Dict[str, Any], *, events: Optional[List[OutboxEvent]] = None) -> None:
     payload = _with_timestamps({"id": key, **data}, new=True)
     payload = _to_firestore(payload)  # ← sanitize
-    _db.collection(COLL_MARKETING).document(key).set(payload, merge=True, retry=RETRY)
+    _set_with_events(_db.collection(COLL_MARKETING).document(key), payload, events)
 
 def list_marketing_assets(
     product_id: Optional[str] = None,
@@ -256,6 +480,25 @@ def get_store(store_id: str) -> Optional[Dict[str, Any]]:
     snap = _db.collection(COLL_STORES).document(store_id).get(retry=RETRY)
     return snap.to_dict() if snap.exists else None
 
+def _count(q: firestore.Query) -> int:
+    """Server-side COUNT() aggregation (no documents are transferred)."""
+    res = q.count(alias="n").get(retry=RETRY)
+    return int(res[0][0].value) if res and res[0] else 0
+
+def refresh_store_stats(store_id: str, artisan_id: str) -> Dict[str, Any]:
+    """
+    Recompute per-store counters with aggregation queries and persist them
+    on the store doc under `stats`, so storefront reads are a single get().
+    """
+    base = _db.collection(COLL_PRODUCTS).where("artisan_id", "==", artisan_id)
+    stats = {
+        "product_count": _count(base),
+        "active_product_count": _count(base.where("is_active", "==", True)),
+    }
+    payload = _to_firestore({"stats": {**stats, "computed_at": SERVER_TIMESTAMP}})
+    _db.collection(COLL_STORES).document(store_id).set(payload, merge=True, retry=RETRY)
+    return stats
+
 def save_user(user_id: str, data: Dict[str, Any]) -> None:
     payload = _with_timestamps({**data, "id": user_id}, new=True)
     payload = _to_firestore(payload)  # ← sanitize
@@ -265,5 +508,116 @@ def get_user(user_id: str) -> Optional[Dict[str, Any]]:
     snap = _db.collection(COLL_USERS).document(user_id).get(retry=RETRY)
     return snap.to_dict() if snap.exists else None
 
+# -------------------------------------------------------------------
+# BULK IMPORT
+# -------------------------------------------------------------------
+def product_bulk_writer(initial_ops_per_second: int = 500, max_ops_per_second: int = 10_000) -> BulkWriter:
+    """
+    Parallel BulkWriter with the 500/50/5 ramp-up: starts at `initial_ops_per_second`
+    and grows 50% every 5 minutes up to `max_ops_per_second`.
+    """
+    opts = BulkWriterOptions(
+        initial_ops_per_second=initial_ops_per_second,
+        max_ops_per_second=max_ops_per_second,
+        mode=SendMode.parallel,
+    )
+    return _db.bulk_writer(options=opts)
+
+def bulk_save_product(bw: BulkWriter, product_id: str, doc: Dict[str, Any]):
+    """Queue the same merge-upsert as save_product() on a BulkWriter; returns the doc ref."""
+    ref = _db.collection(COLL_PRODUCTS).document(product_id)
+    bw.set(ref, _product_payload(product_id, doc), merge=True)
+    return ref
+
+def get_import_job(job_id: str) -> Optional[Dict[str, Any]]:
+    snap = _db.collection(COLL_IMPORTS).document(job_id).get(retry=RETRY)
+    return snap.to_dict() if snap.exists else None
+
+def save_import_job(job_id: str, data: Dict[str, Any]) -> None:
+    payload = _with_timestamps({**data, "id": job_id}, new=True)
+    payload = _to_firestore(payload)  # ← sanitize
+    _db.collection(COLL_IMPORTS).document(job_id).set(payload, merge=True, retry=RETRY)
+
+# -------------------------------------------------------------------
+# MEDIA (metadata of content-addressed objects)
+# -------------------------------------------------------------------
+def save_media(digest: str, data: Dict[str, Any], *, only_if_missing: bool = False) -> None:
+    """
+    Upsert media/{sha256} (path, size, content_type of a content-addressed object).
+    only_if_missing: create-only, an existing doc is left as is (one write, no read).
+    """
+    payload = _to_firestore({**data, "id": digest})
+    payload["updated_at"] = SERVER_TIMESTAMP
+    ref = _db.collection(COLL_MEDIA).document(digest)
+    if not only_if_missing:
+        ref.set(payload, merge=True, retry=RETRY)
+        return
+    try:
+        ref.create(payload, retry=RETRY)
+    except (gexc.AlreadyExists, gexc.Conflict):
+        pass
+
+def get_media(digest: str) -> Optional[Dict[str, Any]]:
+    snap = _db.collection(COLL_MEDIA).document(digest).get(retry=RETRY)
+    return snap.to_dict() if snap.exists else None
 
+# -------------------------------------------------------------------
+# OUTBOX (events committed with the domain write; drained by services/outbox_relay.py)
+# -------------------------------------------------------------------
+def _set_with_events(ref: firestore.DocumentReference,
+                     payload: Dict[str, Any],
+                     events: Optional[List[OutboxEvent]]) -> None:
+    """
+    Merge-set `ref` and, in the same atomic batch, one {ref}/outbox/{event_id} doc per event.
+    The envelope is stored encoded (event_codec) so the relay publishes exactly these bytes.
+    """
+    if not events:
+        ref.set(payload, merge=True, retry=RETRY)
+        return
+    batch = _db.batch()
+    batch.set(ref, payload, merge=True)
+    for topic, envelope, attrs in events:
+        body, codec_attrs = encode(envelope)
+        batch.set(ref.collection(OUTBOX).document(envelope.get("event_id")), {
+            "topic": topic,
+            "data": body,
+            "attrs": {**codec_attrs, **{k: str(v) for k, v in (attrs or {}).items()}},
+            "status": "pending",
+            "attempts": 0,
+            "created_at": SERVER_TIMESTAMP,
+        })
+    batch.commit(retry=RETRY)
+
+def pending_outbox(limit: int = 500) -> List[firestore.DocumentSnapshot]:
+    """Oldest pending events across every outbox (collection-group index: status, created_at)."""
+    q = (_db.collection_group(OUTBOX)
+         .where("status", "==", "pending")
+         .order_by("created_at")
+         .limit(limit))
+    return list(q.stream(retry=RETRY))
 
+def settle_outbox(sent: List[firestore.DocumentReference],
+                  failed: List[Tuple[firestore.DocumentSnapshot, str]],
+                  *,
+                  max_attempts: int) -> None:
+    """
+    Delete published events; count a failed attempt on the rest. An event that has failed
+    `max_attempts` times is parked as status="dead" (kept for inspection, no longer drained).
+    """
+    ops: List[Tuple[str, Any, Optional[Dict[str, Any]]]] = [("delete", ref, None) for ref in sent]
+    for snap, error in failed:
+        attempts = int((snap.get("attempts") if snap.exists else 0) or 0) + 1
+        ops.append(("update", snap.reference, {
+            "attempts": attempts,
+            "last_error": error[:500],
+            "status": "dead" if attempts >= max_attempts else "pending",
+            "updated_at": SERVER_TIMESTAMP,
+        }))
+    for i in range(0, len(ops), 500):           # batch write limit
+        batch = _db.batch()
+        for op, ref, fields in ops[i:i + 500]:
+            if op == "delete":
+                batch.delete(ref)
+            else:
+                batch.update(ref, fields)
+        batch.commit(retry=RETRY)
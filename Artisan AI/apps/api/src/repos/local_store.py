@@ -0,0 +1,228 @@
+# apps/api/src/repos/local_store.py
+# Local filesystem backend (FIREBASE_ONLY / on-prem), same surface as the GCS path in storage.py.
+#   - Sharding: logical "products/p1/a.jpg" lives at ROOT/products/<h0>/<h1>/p1/a.jpg, where
+#     h = sha1(logical path), so no directory grows past ~256 children per level.
+#   - Atomic writes: temp file in the target dir → fsync (per policy) → os.replace.
+#   - LOCAL_FSYNC: "always" (fsync file + dir on every write), "never" (page cache only),
+#     "group" (concurrent writers share one fsync round every LOCAL_FSYNC_WINDOW_MS).
+#   - signed_url: HMAC-SHA256 over (method, path, expires), verified by the /static route.
+# Files written before sharding (flat ROOT/<path>) are still found by resolve().
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(os.getenv("UPLOAD_LOCAL_ROOT", "/app/static"))
+PUBLIC_BASE = os.getenv("PUBLIC_URL_PREFIX", "http://localhost:8080/static")
+SHARD_DEPTH = int(os.getenv("LOCAL_SHARD_DEPTH", "2"))
+FSYNC_POLICY = os.getenv("LOCAL_FSYNC", "group").strip().lower()     # always | never | group
+FSYNC_WINDOW = int(os.getenv("LOCAL_FSYNC_WINDOW_MS", "5")) / 1000.0
+REQUIRE_SIGNED = os.getenv("LOCAL_REQUIRE_SIGNED", "false").strip().lower() in {"1", "true", "yes", "y"}
+
+_sign_key_env = os.getenv("LOCAL_SIGNING_KEY")
+_SIGN_KEY = (_sign_key_env or secrets.token_hex(32)).encode()
+_warned_key = False
+
+
+# -------------------------------------------------------------------
+# Paths
+# -------------------------------------------------------------------
+def _clean(path: str) -> str:
+    parts = [p for p in path.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or any(p == ".." or p.startswith(".") for p in parts):
+        raise ValueError(f"invalid object path: {path!r}")
+    return "/".join(parts)
+
+
+def disk_path(path: str) -> Path:
+    """Sharded on-disk location for a logical object path."""
+    clean = _clean(path)
+    top, _, rest = clean.partition("/")
+    if not rest:                       # single-segment names shard at the root
+        top, rest = "_", top
+    h = hashlib.sha1(clean.encode()).hexdigest()
+    shards = [h[i * 2:i * 2 + 2] for i in range(SHARD_DEPTH)]
+    return ROOT.joinpath(top, *shards, rest)
+
+
+def resolve(path: str) -> Optional[Path]:
+    """Existing file for a logical path: sharded location first, then the legacy flat one."""
+    try:
+        sharded = disk_path(path)
+    except ValueError:
+        return None
+    if sharded.is_file():
+        return sharded
+    flat = ROOT / _clean(path)
+    return flat if flat.is_file() else None
+
+
+def url(path: str) -> str:
+    return f"{PUBLIC_BASE}/{_clean(path)}"
+
+
+# -------------------------------------------------------------------
+# Durability
+# -------------------------------------------------------------------
+class _GroupSync:
+    """
+    Group fsync: writers hand in an open fd and block; a single flusher waits one short
+    window so concurrent writers can join, fsyncs the whole batch, then wakes them.
+    N concurrent writes cost ~1 fsync latency instead of N.
+    """
+
+    def __init__(self, window: float):
+        self._window = window
+        self._cv = threading.Condition()
+        self._pending: List[int] = []
+        self._errors: Dict[int, OSError] = {}
+        self._gen = 0       # batch currently collecting
+        self._done = 0      # batches < _done are flushed
+        threading.Thread(target=self._run, name="local-store-fsync", daemon=True).start()
+
+    def sync(self, fd: int) -> None:
+        with self._cv:
+            self._pending.append(fd)
+            mine = self._gen
+            self._cv.notify_all()
+            while self._done <= mine:
+                self._cv.wait()
+            err = self._errors.pop(fd, None)
+        if err is not None:
+            raise err
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while not self._pending:
+                    self._cv.wait()
+            time.sleep(self._window)
+            with self._cv:
+                batch, self._pending = self._pending, []
+                gen = self._gen
+                self._gen += 1
+            errors = {}
+            for fd in batch:
+                try:
+                    os.fsync(fd)
+                except OSError as e:
+                    errors[fd] = e
+            with self._cv:
+                self._errors.update(errors)
+                self._done = gen + 1
+                self._cv.notify_all()
+
+
+_group = _GroupSync(FSYNC_WINDOW) if FSYNC_POLICY == "group" else None
+
+
+def _fsync(fd: int) -> None:
+    if FSYNC_POLICY == "always":
+        os.fsync(fd)
+    elif _group is not None:
+        _group.sync(fd)
+
+
+def _fsync_dir(directory: Path) -> None:
+    if FSYNC_POLICY == "never":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        _fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def temp_path(path: str) -> Path:
+    """Hidden temp file next to the target (same filesystem → atomic rename)."""
+    full = disk_path(path)
+    full.parent.mkdir(parents=True, exist_ok=True)
+    return full.with_name(f".{full.name}.{uuid.uuid4().hex[:8]}.part")
+
+
+def commit_file(tmp: Path, path: str) -> str:
+    """fsync a finished temp file (per policy) and atomically move it to `path`. Returns its URL."""
+    full = disk_path(path)
+    full.parent.mkdir(parents=True, exist_ok=True)
+    if FSYNC_POLICY != "never":
+        fd = os.open(tmp, os.O_RDONLY)
+        try:
+            _fsync(fd)
+        finally:
+            os.close(fd)
+    os.replace(tmp, full)
+    _fsync_dir(full.parent)
+    return url(path)
+
+
+# -------------------------------------------------------------------
+# Object API (mirrors the GCS helpers in storage.py)
+# -------------------------------------------------------------------
+def write_bytes(path: str, data: bytes, content_type: Optional[str] = None) -> str:
+    tmp = temp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        return commit_file(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def write_text(path: str, text: str, content_type: Optional[str] = None) -> str:
+    return write_bytes(path, text.encode("utf-8"), content_type)
+
+
+def read_bytes(path: str) -> bytes:
+    full = resolve(path)
+    if full is None:
+        raise FileNotFoundError(path)
+    return full.read_bytes()
+
+
+def exists(path: str) -> bool:
+    return resolve(path) is not None
+
+
+def delete(path: str) -> bool:
+    full = resolve(path)
+    if full is None:
+        return False
+    full.unlink(missing_ok=True)
+    return True
+
+
+# -------------------------------------------------------------------
+# Signed URLs (HMAC; no cloud credentials involved)
+# -------------------------------------------------------------------
+def _signature(method: str, path: str, expires: int) -> str:
+    msg = f"{method.upper()}\n{_clean(path)}\n{expires}".encode()
+    return base64.urlsafe_b64encode(hmac.new(_SIGN_KEY, msg, hashlib.sha256).digest()).rstrip(b"=").decode()
+
+
+def signed_url(path: str, minutes: int = 60, method: str = "GET") -> str:
+    global _warned_key
+    if not _sign_key_env and not _warned_key:
+        _warned_key = True
+        print("[local_store] LOCAL_SIGNING_KEY not set; signed URLs are valid for this process only")
+    expires = int(time.time()) + minutes * 60
+    return f"{url(path)}?expires={expires}&sig={_signature(method, path, expires)}"
+
+
+def verify(path: str, expires: Optional[str], sig: Optional[str], method: str = "GET") -> bool:
+    if not expires or not sig or not expires.isdigit() or int(expires) < time.time():
+        return False
+    try:
+        expected = _signature("GET" if method == "HEAD" else method, path, int(expires))
+    except ValueError:
+        return False
+    return hmac.compare_digest(expected, sig)
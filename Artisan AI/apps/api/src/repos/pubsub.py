@@ -7,37 +7,145 @@
 
 from __future__ import annotations
 
-import json
-from typing import Dict, Optional, Any
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any, Tuple
 
-from google.cloud import pubsub_v1
 from ..core.config import get_settings
 from ..models.events import EventEnvelope, make_event
+from .event_codec import encode, encode_event
+from .eventbus import get_bus
 
 _settings = get_settings()
-_publisher = pubsub_v1.PublisherClient()
-_topic_cache: Dict[str, str] = {}
+# Transport is chosen by EVENT_BUS (pubsub | memory | file); see repos/eventbus.py.
+# The module keeps its name: callers publish "to Pub/Sub" whatever the backend.
 
+# Failed fire-and-forget publishes: (topic, data, attrs, attempts). Bounded — when full
+# the oldest message is dropped (and logged) rather than growing without limit.
+_retry: Deque[Tuple[str, bytes, Dict[str, str], int]] = deque(maxlen=_settings.pubsub_retry_buffer_size)
+_retry_lock = threading.Lock()
+MAX_PUBLISH_ATTEMPTS = 5
 
-def _topic_path(topic_name: str) -> str:
-    """Memoize topic path resolution."""
-    if topic_name not in _topic_cache:
-        _topic_cache[topic_name] = _publisher.topic_path(_settings.gcp_project, topic_name)
-    return _topic_cache[topic_name]
+# Priority lanes: the `priority` attribute lets subscriptions filter interactive work
+# (someone waiting on it) apart from bulk work (backfills) on the same topic. Messages
+# without the attribute count as interactive on every worker path.
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BULK)
+
+
+def priority_attrs(priority: Optional[str]) -> Dict[str, str]:
+    """{"priority": ...} for publish(attrs=...); empty when no priority is given."""
+    if priority is None:
+        return {}
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {PRIORITIES}, got {priority!r}")
+    return {"priority": priority}
 
 
 def publish(topic_name: str, payload: Dict[str, Any], *, attrs: Optional[Dict[str, str]] = None) -> str:
     """
     Publish a pre-built payload to a specific Pub/Sub topic.
     - `topic_name`: e.g. "content.requested" | "content.generated" | "marketing.asset.requested"
-    - `payload`: dict (will be json-encoded)
+    - `payload`: dict (encoded per EVENT_ENCODING; content_type/schema_id attributes added)
     - `attrs`: optional message attributes (string-only values)
     Returns Pub/Sub message_id.
     """
-    topic_path = _topic_path(topic_name)
-    data = json.dumps(payload).encode("utf-8")
-    future = _publisher.publish(topic_path, data, **(attrs or {}))
-    return future.result()
+    data, codec_attrs = encode(payload)
+    return _send_wait(topic_name, data, {**codec_attrs, **(attrs or {})})
+
+
+def _send_wait(topic_name: str, data: bytes, attrs: Dict[str, str]) -> str:
+    return get_bus().send(topic_name, data, attrs).result()
+
+
+def publish_many(
+    messages: List[Tuple[str, bytes, Dict[str, str]]],
+    *,
+    timeout: float = 60.0,
+) -> List[Optional[Exception]]:
+    """
+    Publish already-encoded (topic, data, attrs) messages together and wait for every ack.
+    All futures are created before any is awaited, so they share client-side batches.
+    Returns one entry per message: None if published, else the error.
+    """
+    bus = get_bus()
+    futures = [bus.send(t, data, attrs) for t, data, attrs in messages]
+    errors: List[Optional[Exception]] = []
+    for f in futures:
+        try:
+            f.result(timeout=timeout)
+            errors.append(None)
+        except Exception as e:   # reported per message
+            errors.append(e)
+    return errors
+
+
+# -------------------------------------------------------------------
+# Fire-and-forget publishing (no broker round trip on the request path)
+# -------------------------------------------------------------------
+def _send(topic_name: str, data: bytes, attrs: Dict[str, str], attempts: int) -> None:
+    future = get_bus().send(topic_name, data, attrs)
+
+    def _done(f) -> None:
+        exc = f.exception()
+        if exc is None:
+            return
+        if attempts + 1 >= MAX_PUBLISH_ATTEMPTS:
+            print(f"[pubsub] giving up on {topic_name} after {attempts + 1} attempts: {exc}")
+            return
+        with _retry_lock:
+            if len(_retry) == _retry.maxlen:
+                dropped = _retry[0]
+                print(f"[pubsub] retry buffer full; dropping oldest message for {dropped[0]}")
+            _retry.append((topic_name, data, attrs, attempts + 1))
+
+    future.add_done_callback(_done)
+
+
+def _drain_retries() -> None:
+    with _retry_lock:
+        pending = list(_retry)
+        _retry.clear()
+    for topic_name, data, attrs, attempts in pending:
+        _send(topic_name, data, attrs, attempts)
+
+
+def publish_nowait(topic_name: str, payload: Dict[str, Any], *, attrs: Optional[Dict[str, str]] = None) -> None:
+    """
+    Queue a publish and return immediately. The client batches it (see BatchSettings);
+    failures are re-queued through a bounded retry buffer that is drained on the next
+    publish and on flush(). Use for notifications where the caller doesn't need the id.
+    """
+    data, codec_attrs = encode(payload)
+    _send_nowait(topic_name, data, {**codec_attrs, **(attrs or {})})
+
+
+def _send_nowait(topic_name: str, data: bytes, attrs: Dict[str, str]) -> None:
+    if _retry:
+        _drain_retries()
+    _send(topic_name, data, attrs, 0)
+
+
+def flush(timeout: float = 10.0) -> None:
+    """
+    Send everything still buffered (retries included) and stop the publisher.
+    Call once on shutdown; later publishes will fail.
+    """
+    _drain_retries()
+    done = threading.Event()
+
+    def _stop() -> None:
+        try:
+            get_bus().stop()   # flushes open batches and waits for them
+        finally:
+            done.set()
+
+    threading.Thread(target=_stop, name="pubsub-flush", daemon=True).start()
+    if not done.wait(timeout):
+        print(f"[pubsub] flush timed out after {timeout}s; unsent messages are lost")
+    if _retry:
+        print(f"[pubsub] {len(_retry)} message(s) still failing at shutdown")
 
 
 def publish_event(
@@ -48,7 +156,8 @@ def publish_event(
     actor: Optional[Dict[str, Any]] = None,
     idempotency_key: Optional[str] = None,
     topic_name: Optional[str] = None,
-) -> str:
+    wait: bool = True,
+) -> Optional[str]:
     """
     Build an EventEnvelope and publish it.
     - If `topic_name` is provided, publish there.
@@ -56,6 +165,7 @@ def publish_event(
         * content.*   → _settings.pubsub_topic_content
         * marketing.* → _settings.pubsub_topic_marketing
         * else        → use event_type as topic name (advanced/manual routing)
+    - wait=False: fire-and-forget via publish_nowait (returns None).
     """
     ev: EventEnvelope = make_event(
         event_type,
@@ -88,7 +198,12 @@ def publish_event(
     if ev.idempotency_key:
         attrs["idempotency_key"] = ev.idempotency_key
 
-    return publish(topic, ev.model_dump(), attrs=attrs)
+    body, codec_attrs = encode_event(ev)
+    attrs.update(codec_attrs)
+    if not wait:
+        _send_nowait(topic, body, attrs)
+        return None
+    return _send_wait(topic, body, attrs)
 
 
 
@@ -1,11 +1,16 @@
 # apps/api/src/repos/storage.py
 import os, uuid, re
+import base64, gzip, hashlib, tempfile, threading, time
 from datetime import timedelta, datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 import os
 from pathlib import Path
 from typing import Optional
 
+from cachetools import LRUCache
+
+from . import local_store
+
 # Accept common truthy strings
 _FFLAG = os.getenv("FIREBASE_ONLY", "false").strip().lower()
 FIREBASE_ONLY = _FFLAG in {"1", "true", "yes", "y"}
@@ -18,6 +23,7 @@ LOCAL_ROOT  = os.getenv("UPLOAD_LOCAL_ROOT", "/app/static")  # bind-mounted
 _client = None
 _bucket = None
 _settings = None
+_sign_lock = threading.Lock()
 
 _slug_re = re.compile(r"[^a-z0-9\-]+")
 
@@ -28,11 +34,126 @@ def _slug(s: str) -> str:
 
 
 def write_bytes(path: str, data: bytes, content_type: Optional[str] = None) -> str:
-    full = Path(LOCAL_ROOT) / path
-    full.parent.mkdir(parents=True, exist_ok=True)
-    with open(full, "wb") as f:
-        f.write(data)
-    return f"{PUBLIC_BASE}/{path}"
+    """Local (sharded, atomic) write; returns the PUBLIC_URL_PREFIX URL."""
+    return local_store.write_bytes(path, data, content_type)
+
+
+# ---------- Content-addressed media (dedupe by SHA-256) ----------
+
+CAS_PREFIX = "media/sha256"
+# digests known to exist in storage (positive cache only; a miss always re-checks)
+_known_digests: LRUCache = LRUCache(maxsize=int(os.getenv("CAS_EXISTS_CACHE_SIZE", "100000")))
+_known_lock = threading.Lock()
+
+
+def content_path(digest: str, ext: str = "") -> str:
+    """media/sha256/ab/abcdef….jpg — two-char fan-out keeps listings/dirs small."""
+    return f"{CAS_PREFIX}/{digest[:2]}/{digest}{ext}"
+
+
+def _url_for(path: str) -> str:
+    return f"{PUBLIC_BASE}/{path}" if FIREBASE_ONLY else public_url(path)
+
+
+def exists(path: str) -> bool:
+    if FIREBASE_ONLY:
+        return local_store.exists(path)
+    _ensure_gcs()
+    return _bucket.blob(path).exists()
+
+
+def _cas_exists(digest: str, path: str) -> bool:
+    with _known_lock:
+        if path in _known_digests:
+            return True
+    found = exists(path)
+    if found:
+        with _known_lock:
+            _known_digests[path] = True
+    return found
+
+
+def lookup_content(digest: str, ext: str = "") -> Optional[str]:
+    """URL of an already-stored object with this digest, or None (lets clients skip the upload)."""
+    path = content_path(digest.lower(), ext)
+    return _url_for(path) if _cas_exists(digest, path) else None
+
+
+class ContentWriter:
+    """
+    Streams an upload into a local temp file while hashing it. On commit the object
+    is stored at content_path(sha256) only if it is not there yet, so re-submitting
+    the same image costs a hash instead of an upload. Objects are recorded in
+    media/{sha256}; a deduped commit creates the record if it is missing (e.g. the write
+    after an earlier upload failed), so it can't stay unrecorded forever.
+    """
+
+    def __init__(self, content_type: Optional[str] = None, ext: str = ""):
+        self.content_type = content_type or "application/octet-stream"
+        self.ext = ext
+        self.size = 0
+        self.path: Optional[str] = None
+        self.deduped = False
+        self._sha = hashlib.sha256()
+        tmp_dir = Path(LOCAL_ROOT) / ".tmp" if FIREBASE_ONLY else None   # same fs → rename
+        if tmp_dir is not None:
+            tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._fh = tempfile.NamedTemporaryFile(dir=tmp_dir, suffix=".part", delete=False)
+
+    def write(self, chunk: bytes) -> None:
+        self._fh.write(chunk)
+        self._sha.update(chunk)
+        self.size += len(chunk)
+
+    @property
+    def digest(self) -> str:
+        return self._sha.hexdigest()
+
+    def commit(self) -> str:
+        self._fh.close()
+        tmp = Path(self._fh.name)
+        digest = self.digest
+        self.path = path = content_path(digest, self.ext)
+        try:
+            if _cas_exists(digest, path):
+                self.deduped = True
+            elif FIREBASE_ONLY:
+                local_store.commit_file(tmp, path)
+            else:
+                from google.api_core.exceptions import PreconditionFailed  # type: ignore
+                try:
+                    # if_generation_match=0: create-only, a concurrent identical upload is fine
+                    _bucket.blob(path).upload_from_filename(
+                        str(tmp), content_type=self.content_type, if_generation_match=0,
+                    )
+                except PreconditionFailed:
+                    self.deduped = True
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        with _known_lock:
+            _known_digests[path] = True
+        from . import firestore as fs
+        fs.save_media(digest, {"path": path, "size": self.size, "content_type": self.content_type},
+                      only_if_missing=self.deduped)
+        return _url_for(path)
+
+    def abort(self) -> None:
+        self._fh.close()
+        Path(self._fh.name).unlink(missing_ok=True)
+
+
+def open_writer(content_type: Optional[str] = None, *, ext: str = "") -> ContentWriter:
+    """Content-addressed ContentWriter for a streamed upload (GCS is set up first)."""
+    if not FIREBASE_ONLY:
+        _ensure_gcs()
+    return ContentWriter(content_type, ext)
+
+
+def content_meta(digest: str) -> Dict:
+    """Stored metadata (size, content_type) of a content-addressed object, {} if unknown."""
+    from . import firestore as fs
+    return fs.get_media(digest) or {}
 
 
 def _ensure_gcs():
@@ -62,29 +183,160 @@ def _ensure_gcs():
     _bucket = _client.bucket(_settings.gcs_bucket)
 
 
+def _signing_kwargs() -> Dict:
+    """
+    Signer arguments for blob.generate_signed_url, reusing the client's credentials.
+      - Service-account key file: signs locally with the loaded key.
+      - ADC token credentials (Cloud Run/GCE): signs via IAM signBlob using the cached
+        access token, refreshed only when it has expired (not once per URL).
+    """
+    _ensure_gcs()
+    from google.auth.credentials import Signing  # type: ignore
+
+    creds = _client._credentials
+    if isinstance(creds, Signing):
+        return {"credentials": creds}
+    with _sign_lock:
+        if not creds.valid:
+            from google.auth.transport.requests import Request  # type: ignore
+            creds.refresh(Request())
+        return {"service_account_email": creds.service_account_email, "access_token": creds.token}
+
+
 # ---------- READ/WRITE HELPERS (you already had these) ----------
 
+# Text artifacts (markdown/JSON) are stored gzip-encoded; GCS decompressive transcoding
+# serves plain bytes to clients that don't send Accept-Encoding: gzip, and the Python
+# client decodes on download. (Brotli is not transcoded by GCS, so gzip only.)
+GZIP_MIN_BYTES = int(os.getenv("STORAGE_GZIP_MIN_BYTES", "1024"))
+
+
+def gzip_bytes(data: bytes) -> bytes:
+    """Deterministic gzip (mtime=0): same text → same stored bytes/MD5."""
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _upload_text(blob, data: bytes, content_type: str) -> None:
+    if len(data) >= GZIP_MIN_BYTES:
+        blob.content_encoding = "gzip"
+        data = gzip_bytes(data)
+    blob.upload_from_string(data, content_type=content_type)
+
+
 def write_text(path: str, text: str, content_type: Optional[str] = None) -> str:
     """
-    Writes text to GCS (or returns a no-op URI in MVP).
+    Writes text to GCS (FIREBASE_ONLY: to the local store).
     Returns gs://... when GCS is used, or firebase://... when FIREBASE_ONLY.
     """
     if FIREBASE_ONLY:
+        local_store.write_text(path, text, content_type)
         return f"firebase://{path}"
 
     _ensure_gcs()
     blob = _bucket.blob(path)
-    blob.upload_from_string(text, content_type=content_type or "text/markdown; charset=utf-8")
+    _upload_text(blob, text.encode("utf-8"), content_type or "text/markdown; charset=utf-8")
     return f"gs://{_settings.gcs_bucket}/{path}"
 
 
-def signed_url(path: str, minutes: int = 60) -> Optional[str]:
-    """Signed GET URL for viewing (browser-safe)."""
+def write_text_if_changed(path: str, text: str, content_type: Optional[str] = None) -> Tuple[str, bool, str]:
+    """
+    write_text that skips the upload when the stored object already has the same bytes.
+    The object's sha256 is kept in its custom metadata (MD5 from GCS is the fallback),
+    so the check is one metadata GET instead of a download.
+    Returns (uri, changed, sha256_hex). FIREBASE_ONLY compares the local copy.
+    """
+    data = text.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
     if FIREBASE_ONLY:
-        return None
+        current = local_store.resolve(path)
+        if current is not None and current.read_bytes() == data:
+            return f"firebase://{path}", False, digest
+        local_store.write_bytes(path, data, content_type)
+        return f"firebase://{path}", True, digest
+
     _ensure_gcs()
+    uri = f"gs://{_settings.gcs_bucket}/{path}"
+    current = _bucket.get_blob(path)
+    if current is not None:
+        stored = (current.metadata or {}).get("sha256")
+        md5 = base64.b64encode(hashlib.md5(data).digest()).decode()
+        if stored == digest or (stored is None and current.md5_hash == md5):
+            return uri, False, digest
+
     blob = _bucket.blob(path)
-    return blob.generate_signed_url(expiration=timedelta(minutes=minutes))
+    blob.metadata = {"sha256": digest}
+    _upload_text(blob, data, content_type or "text/markdown; charset=utf-8")
+    return uri, True, digest
+
+
+def read_text(uri: str) -> str:
+    """
+    Read a text artifact by the URI write_text returned (gs://bucket/key, firebase://key)
+    or a bare key. gzip Content-Encoding is undone transparently.
+    """
+    if uri.startswith("firebase://") or (FIREBASE_ONLY and not uri.startswith("gs://")):
+        return local_store.read_bytes(uri.removeprefix("firebase://")).decode("utf-8")
+
+    _ensure_gcs()
+    bucket, key = _bucket, uri
+    if uri.startswith("gs://"):
+        name, _, key = uri[len("gs://"):].partition("/")
+        bucket = _bucket if name == _bucket.name else _client.bucket(name)
+    blob = bucket.get_blob(key)
+    if blob is None:
+        raise FileNotFoundError(uri)
+    data = blob.download_as_bytes()
+    if blob.content_encoding == "gzip" and data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    return data.decode("utf-8")
+
+
+# Signed URLs are reused until this long before they expire, so a URL handed to the
+# browser always has at least the margin left to load. A cached URL is only served if it
+# expires no later than the caller's `minutes` allow (a short-lived request never gets a
+# longer-lived URL signed earlier).
+SIGNED_URL_MARGIN = int(os.getenv("SIGNED_URL_MARGIN_SECONDS", "300"))
+_signed_cache: LRUCache = LRUCache(maxsize=int(os.getenv("SIGNED_URL_CACHE_SIZE", "10000")))
+_signed_lock = threading.Lock()
+
+
+def _cached_signed(path: str, method: str, minutes: int, signing: Optional[Dict] = None) -> str:
+    key = (path, method)
+    now = time.monotonic()
+    with _signed_lock:
+        hit = _signed_cache.get(key)
+    if hit is not None and now + SIGNED_URL_MARGIN < hit[1] <= now + minutes * 60:
+        return hit[0]
+
+    url = _bucket.blob(path).generate_signed_url(
+        version="v4",
+        expiration=timedelta(minutes=minutes),
+        method=method,
+        **(signing if signing is not None else _signing_kwargs()),
+    )
+    with _signed_lock:
+        _signed_cache[key] = (url, now + minutes * 60)
+    return url
+
+
+def signed_url(path: str, minutes: int = 60) -> Optional[str]:
+    """Signed GET URL for viewing (browser-safe), valid for at most `minutes`; cached."""
+    if FIREBASE_ONLY:
+        return local_store.signed_url(path, minutes)   # HMAC, cheap enough to skip the cache
+    _ensure_gcs()
+    return _cached_signed(path, "GET", minutes)
+
+
+def signed_urls(paths: List[str], minutes: int = 60) -> Dict[str, Optional[str]]:
+    """
+    signed_url for a whole list response: {path: url}. Cache hits cost a dict lookup;
+    misses share one signer.
+    """
+    if FIREBASE_ONLY:
+        return {p: local_store.signed_url(p, minutes) for p in paths}
+    _ensure_gcs()
+    signing = _signing_kwargs()
+    return {p: _cached_signed(p, "GET", minutes, signing) for p in dict.fromkeys(paths)}
 
 
 # ---------- NEW: PUBLIC URL + SIGNED PUT FOR BROWSER UPLOAD ----------
@@ -107,6 +359,28 @@ def _object_name(filename: str) -> str:
     return f"uploads/{ts}-{uuid.uuid4().hex[:8]}-{base}"
 
 
+def _sign_put(name: str, content_type: str, signing: Dict) -> Dict[str, Optional[str]]:
+    upload_url = _bucket.blob(name).generate_signed_url(
+        version="v4",
+        expiration=timedelta(minutes=15),
+        method="PUT",
+        content_type=content_type or "application/octet-stream",
+        **signing,
+    )
+    return {
+        "upload_url": upload_url,
+        "public_url": public_url(name),
+        "object_name": name,
+    }
+
+
+_PLACEHOLDER_PUT = {
+    "upload_url": None,
+    "public_url": "/placeholder-640x360.png",
+    "object_name": "placeholder"
+}
+
+
 def signed_put_url(filename: str, content_type: str = "application/octet-stream") -> Dict[str, Optional[str]]:
     """
     Generate a V4 signed PUT URL so the browser can upload directly to GCS.
@@ -118,27 +392,17 @@ def signed_put_url(filename: str, content_type: str = "application/octet-stream"
       }
     """
     if FIREBASE_ONLY:
-        return {
-            "upload_url": None,
-            "public_url": "/placeholder-640x360.png",
-            "object_name": "placeholder"
-        }
-
-    _ensure_gcs()
-    from google.cloud import storage as gcs  # type: ignore
+        return dict(_PLACEHOLDER_PUT)
+    return _sign_put(_object_name(filename), content_type, _signing_kwargs())
 
-    name = _object_name(filename)
-    blob = _bucket.blob(name)
-
-    upload_url = blob.generate_signed_url(
-        version="v4",
-        expiration=timedelta(minutes=15),
-        method="PUT",
-        content_type=content_type or "application/octet-stream",
-    )
-    return {
-        "upload_url": upload_url,
-        "public_url": public_url(name),
-        "object_name": name,
-    }
 
+def signed_put_urls(files: List[Tuple[str, str]]) -> List[Dict[str, Optional[str]]]:
+    """
+    signed_put_url for many (filename, content_type) pairs; the signer is resolved once
+    and shared by the whole batch (V4 signing itself is local, no request per URL
+    with a key file).
+    """
+    if FIREBASE_ONLY:
+        return [dict(_PLACEHOLDER_PUT) for _ in files]
+    signing = _signing_kwargs()
+    return [_sign_put(_object_name(fn), ct, signing) for fn, ct in files]
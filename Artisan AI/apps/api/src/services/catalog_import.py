@@ -0,0 +1,189 @@
+# apps/api/src/services/catalog_import.py
+# Purpose: Bulk catalog import (JSONL / CSV) for onboarding whole cooperatives.
+# Do: stream rows → validate with a cached TypeAdapter(ProductIn) → Firestore BulkWriter
+#     (parallel, 500/50/5 ramp-up); checkpoint progress in imports/{job_id} so a
+#     re-run with the same job_id resumes; collect a per-row error report.
+# Used by: POST /v1/products:import and scripts/import_catalog.py.
+
+from __future__ import annotations
+
+import csv
+import json
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional, TextIO, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from ..core.config import get_settings
+from ..models.product import ProductIn
+from ..repos import firestore as fs
+
+settings = get_settings()
+
+Format = Literal["jsonl", "csv"]
+
+# Keep the job doc well under Firestore's 1 MiB limit; the full list is returned to the caller.
+MAX_STORED_ERRORS = 200
+
+# CSV cells that hold structured values
+_CSV_LIST_FIELDS = {"materials", "images"}
+_CSV_JSON_FIELDS = {"attributes", "provenance"}
+_CSV_NUMBER_FIELDS = {"base_cost", "skill_factor", "price", "inventory", "popularity"}
+
+
+@lru_cache(maxsize=1)
+def product_adapter() -> TypeAdapter[ProductIn]:
+    """Build the validator once; TypeAdapter construction is the expensive part."""
+    return TypeAdapter(ProductIn)
+
+
+# --------------------------------------------------------------------
+# Row readers (both yield (row_no, dict); row_no is 1-based data rows)
+# --------------------------------------------------------------------
+def iter_jsonl(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    row_no = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        row_no += 1
+        try:
+            yield row_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_no, ValueError(f"invalid JSON: {e}")
+
+
+def _csv_cell(key: str, val: str) -> Any:
+    val = val.strip()
+    if val == "":
+        return None
+    if key in _CSV_LIST_FIELDS:
+        if val.startswith("["):
+            return json.loads(val)
+        return [x.strip() for x in val.replace("|", ";").split(";") if x.strip()]
+    if key in _CSV_JSON_FIELDS:
+        return json.loads(val)
+    if key in _CSV_NUMBER_FIELDS:
+        return float(val) if any(c in val for c in ".eE") else int(val)
+    if key == "is_active":
+        return val.lower() in {"1", "true", "yes", "y"}
+    return val
+
+
+def iter_csv(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    for row_no, raw in enumerate(csv.DictReader(lines), start=1):
+        try:
+            row = {k.strip(): _csv_cell(k.strip(), v or "") for k, v in raw.items() if k}
+            yield row_no, {k: v for k, v in row.items() if v is not None}
+        except (ValueError, json.JSONDecodeError) as e:
+            yield row_no, ValueError(f"invalid CSV cell: {e}")
+
+
+def iter_rows(stream: TextIO, fmt: Format) -> Iterator[Tuple[int, Any]]:
+    return iter_csv(stream) if fmt == "csv" else iter_jsonl(stream)
+
+
+# --------------------------------------------------------------------
+# Import
+# --------------------------------------------------------------------
+def _validate(row: Any) -> Tuple[str, Dict[str, Any]]:
+    """Return (product_id, doc) or raise ValueError/ValidationError."""
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    product_id = str(row.get("id") or "").strip()
+    if not product_id or "/" in product_id:
+        raise ValueError("missing or invalid 'id'")
+    product = product_adapter().validate_python(row)
+    # same shape upsert_product() stores: raw extras + normalized model fields
+    doc = {**row, **product.model_dump(exclude_unset=True), "id": product_id}
+    return product_id, doc
+
+
+def import_products(
+    rows: Iterable[Tuple[int, Any]],
+    *,
+    job_id: str,
+    checkpoint_every: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Validate + write rows through a BulkWriter. Every `checkpoint_every` rows the writer
+    is flushed and imports/{job_id}.next_row is persisted; on resume, rows before it are
+    skipped. Returns {job_id, status, written, failed, skipped, next_row, errors:[{row,id,error}]}.
+    """
+    every = max(1, checkpoint_every or settings.import_checkpoint_every)
+    prev = fs.get_import_job(job_id) or {}
+    start_row = int(prev.get("next_row") or 1) if prev.get("status") != "done" else 1
+
+    lock = threading.Lock()
+    # resumed: carry the stored errors forward, the next checkpoint rewrites the list
+    errors: List[Dict[str, Any]] = list(prev.get("errors") or []) if start_row > 1 else []
+    counts = {
+        "written": int(prev.get("written") or 0) if start_row > 1 else 0,
+        "failed": int(prev.get("failed") or 0) if start_row > 1 else 0,
+        "skipped": 0,
+    }
+    pending: Dict[str, int] = {}   # product_id → row_no (for mapping write failures back)
+
+    bw = fs.product_bulk_writer(
+        initial_ops_per_second=settings.import_initial_ops_per_second,
+        max_ops_per_second=settings.import_max_ops_per_second,
+    )
+
+    # Callbacks run on BulkWriter's worker threads.
+    def _on_result(ref, _result, _bw) -> None:
+        with lock:
+            pending.pop(ref.id, None)
+            counts["written"] += 1
+
+    def _on_error(failure, _bw) -> bool:
+        if failure.attempts < 5 and failure.code in (4, 8, 10, 13, 14):   # transient gRPC codes
+            return True
+        with lock:
+            pid = failure.operation.reference.id
+            row_no = pending.pop(pid, None)
+            counts["failed"] += 1
+            errors.append({"row": row_no, "id": pid, "error": f"write {failure.code}: {failure.message}"})
+        return False
+
+    bw.on_write_result(_on_result)
+    bw.on_write_error(_on_error)
+
+    def _checkpoint(next_row: int, status: str) -> None:
+        bw.flush()
+        with lock:
+            snapshot = {**counts, "errors": errors[:MAX_STORED_ERRORS]}
+        fs.save_import_job(job_id, {"status": status, "next_row": next_row, **snapshot})
+
+    last_row = start_row - 1
+    try:
+        for row_no, row in rows:
+            if row_no < start_row:
+                counts["skipped"] += 1
+                continue
+            last_row = row_no
+            try:
+                product_id, doc = _validate(row)
+            except (ValueError, ValidationError) as e:
+                pid = row.get("id") if isinstance(row, dict) else None
+                with lock:
+                    counts["failed"] += 1
+                    errors.append({"row": row_no, "id": pid, "error": str(e)})
+            else:
+                with lock:
+                    pending[product_id] = row_no   # register first: callbacks may fire inside set()
+                fs.bulk_save_product(bw, product_id, doc)
+
+            if row_no % every == 0:
+                _checkpoint(row_no + 1, "running")
+
+        bw.close()   # flush remaining operations; later flush() calls are no-ops
+        _checkpoint(last_row + 1, "done")
+    except Exception:
+        # everything before the row being processed was queued; flush it and resume there
+        _checkpoint(max(last_row, start_row), "failed")
+        raise
+
+    return {"job_id": job_id, "status": "done", "next_row": last_row + 1, **counts, "errors": errors}
@@ -25,7 +25,13 @@ def request_generation(
     langs: List[str],
     tone: str,
     actor: Dict[str, Any] | None = None,
+    priority: str = pubsub.PRIORITY_INTERACTIVE,
 ) -> str:
+    """
+    priority: "interactive" (an artisan waiting on the result) or "bulk" (backfills,
+    catalog-wide regeneration). Sent as the `priority` attribute; the worker reads the
+    two lanes from separately filtered subscriptions (see Worker consumers/flow_control.py).
+    """
     topic_requested = getattr(settings, "TOPIC_CONTENT_REQUESTED", None) or settings.pubsub_topic_content
     envelope = EventEnvelope(
         type="content.requested",
@@ -34,7 +40,7 @@ def request_generation(
     ).model_dump()
     if actor:
         envelope["actor"] = actor
-    return pubsub.publish(topic_requested, envelope)
+    return pubsub.publish(topic_requested, envelope, attrs=pubsub.priority_attrs(priority))
 
 
 # --------------------------------------------------------------------
@@ -180,32 +186,35 @@ def generate_story_sync(product_id: str, product: dict, tone: str, langs: List[s
             text = _mock_text(product, tone, lang)
             print(f"⚠️ Using mock content for {lang}")
 
-        # Persist
+        # Persist (byte-identical output → no upload, no doc write, no event)
         path = f"content/{product_id}_{lang}.md"
-        gcs_uri = storage.write_text(path, text, content_type="text/markdown; charset=utf-8")
+        gcs_uri, blob_changed, digest = storage.write_text_if_changed(
+            path, text, content_type="text/markdown; charset=utf-8"
+        )
         http_url = storage.public_url(path)
 
-        fs.save_story(
+        # Doc + content.generated event commit together (outbox); the relay publishes it.
+        # A changed object always rewrites the doc so its event isn't lost.
+        event = EventEnvelope(
+            type="content.generated",
+            data={
+                "product_id": product_id,
+                "lang": lang,
+                "tone": tone,
+                "gcs_path": path,
+                "http_url": http_url,
+            },
+        )
+        written = fs.save_story(
             product_id,
             lang,
-            {"gcs_uri": gcs_uri, "http_url": http_url, "tone": tone, "version": 1, "approved": True},
+            {"gcs_uri": gcs_uri, "http_url": http_url, "tone": tone, "version": 1, "approved": True,
+             "content_sha256": digest},
+            skip_unchanged=not blob_changed,
+            events=[(topic_generated, event.model_dump(), {"type": event.type, "event_id": event.event_id})],
         )
-
-        # Notify (best-effort)
-        try:
-            env = EventEnvelope(
-                type="content.generated",
-                data={
-                    "product_id": product_id,
-                    "lang": lang,
-                    "tone": tone,
-                    "gcs_path": path,
-                    "http_url": http_url,
-                },
-            ).model_dump()
-            pubsub.publish(topic_generated, env)
-        except Exception as e:
-            print(f"⚠️ publish content.generated failed: {e}")
+        if not written:
+            print(f"↺ story {product_id}_{lang} unchanged; skipped write + content.generated")
 
         # Return pointer (with immediate text for UI)
         results.append(
@@ -0,0 +1,132 @@
+# apps/api/src/services/markdown_html.py
+# Purpose: Render story Markdown to sanitized HTML on the server.
+# Escape-first: every character of input is HTML-escaped before any markup is added,
+# so raw HTML in the model output can never reach the page. Only a small Markdown
+# subset is produced (what generated stories use): headings, paragraphs, emphasis,
+# inline code, fenced code, lists, blockquotes, rules and http(s)/mailto links.
+
+from __future__ import annotations
+
+import html
+import re
+from typing import List
+
+# Bump when the output changes so cached renders / ETags roll over.
+RENDER_VERSION = "2"
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_ULIST = re.compile(r"^\s*[-*+]\s+(.*)$")
+_OLIST = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_FENCE = re.compile(r"^\s*```")
+
+_CODE = re.compile(r"`([^`]+)`")
+_LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_STRONG = re.compile(r"(\*\*|(?<!\w)__)(?=\S)(.+?)(?<=\S)\1")
+_EM = re.compile(r"(\*|(?<!\w)_)(?=\S)(.+?)(?<=\S)\1(?!\w)")
+_SAFE_URL = re.compile(r"^(https?://|mailto:)", re.I)
+
+
+def _emphasis(text: str) -> str:
+    text = _STRONG.sub(r"<strong>\2</strong>", text)
+    return _EM.sub(r"<em>\2</em>", text)
+
+
+def _inline(text: str) -> str:
+    """
+    Inline markup over already-escaped text. Code spans and finished links are swapped
+    for placeholders before emphasis runs, so `_`/`*` in code, URLs or attributes are
+    never read as markup; link labels get their emphasis on their own.
+    """
+    out = html.escape(text.replace("\x00", "").replace("\x01", ""), quote=True)   # placeholder marks
+    codes: List[str] = []
+    links: List[str] = []
+
+    def _stash_code(m: re.Match) -> str:
+        codes.append(f"<code>{m.group(1)}</code>")
+        return f"\x00{len(codes) - 1}\x00"
+
+    out = _CODE.sub(_stash_code, out)
+
+    def _stash_link(m: re.Match) -> str:
+        label, href = _emphasis(m.group(1)), html.unescape(m.group(2))
+        if not _SAFE_URL.match(href):
+            return label
+        links.append(f'<a href="{html.escape(href, quote=True)}" rel="nofollow noopener" target="_blank">{label}</a>')
+        return f"\x01{len(links) - 1}\x01"
+
+    out = _LINK.sub(_stash_link, out)
+    out = _emphasis(out)
+    out = re.sub(r"\x01(\d+)\x01", lambda m: links[int(m.group(1))], out)
+    return re.sub(r"\x00(\d+)\x00", lambda m: codes[int(m.group(1))], out)
+
+
+def render(markdown: str) -> str:
+    lines = (markdown or "").replace("\r\n", "\n").split("\n")
+    out: List[str] = []
+    para: List[str] = []
+    list_tag = None
+    quote: List[str] = []
+
+    def flush_para() -> None:
+        if para:
+            out.append(f"<p>{_inline(' '.join(s.strip() for s in para))}</p>")
+            para.clear()
+
+    def close_list() -> None:
+        nonlocal list_tag
+        if list_tag:
+            out.append(f"</{list_tag}>")
+            list_tag = None
+
+    def flush_quote() -> None:
+        if quote:
+            out.append(f"<blockquote>{render(chr(10).join(quote))}</blockquote>")
+            quote.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+
+        if _FENCE.match(line):
+            flush_para(); close_list(); flush_quote()
+            body = []
+            i += 1
+            while i < len(lines) and not _FENCE.match(lines[i]):
+                body.append(lines[i])
+                i += 1
+            out.append(f"<pre><code>{html.escape(chr(10).join(body))}</code></pre>")
+            i += 1
+            continue
+
+        if line.lstrip().startswith(">"):
+            flush_para(); close_list()
+            quote.append(line.lstrip()[1:].removeprefix(" "))
+            i += 1
+            continue
+        flush_quote()
+
+        if not line.strip():
+            flush_para(); close_list()
+        elif m := _HEADING.match(line):
+            flush_para(); close_list()
+            level = len(m.group(1))
+            out.append(f"<h{level}>{_inline(m.group(2))}</h{level}>")
+        elif _RULE.match(line):
+            flush_para(); close_list()
+            out.append("<hr>")
+        elif (m := _ULIST.match(line)) or (m2 := _OLIST.match(line)):
+            flush_para()
+            tag = "ul" if m else "ol"
+            if list_tag != tag:
+                close_list()
+                out.append(f"<{tag}>")
+                list_tag = tag
+            out.append(f"<li>{_inline((m or m2).group(1))}</li>")
+        else:
+            close_list()
+            para.append(line)
+        i += 1
+
+    flush_para(); close_list(); flush_quote()
+    return "\n".join(out)
@@ -11,6 +11,7 @@ from typing import List, Dict, Any, Optional
 
 from ..core.config import get_settings
 from ..repos import firestore as fs, pubsub
+from ..models.events import EventEnvelope
 
 # Optional: if you already have a pydantic model
 try:
@@ -135,23 +136,17 @@ def create_marketing_asset_sync(
         "best_time_iso": best_time_iso,
         # "image_uri": ...  # add when you render images
     }
-    fs.save_marketing_asset(key, doc)
-
-    # Emit created event (best-effort)
-    try:
-        env = {
-            "type": "marketing.asset.created",
-            "source": "api",
-            "data": {"product_id": product["id"], "lang": lang, "channel": channel, "doc_id": key},
-        }
-        pubsub.publish(
-            (getattr(settings, "TOPIC_MARKETING_CREATED", None) or settings.pubsub_topic_marketing).replace(
-                ".requested", ".created"
-            ),
-            env,
-        )
-    except Exception:
-        pass
+    # Doc + marketing.asset.created commit together (outbox); the relay publishes it.
+    topic_created = (getattr(settings, "TOPIC_MARKETING_CREATED", None) or settings.pubsub_topic_marketing).replace(
+        ".requested", ".created"
+    )
+    event = EventEnvelope(
+        type="marketing.asset.created",
+        data={"product_id": product["id"], "lang": lang, "channel": channel, "doc_id": key},
+    )
+    fs.save_marketing_asset(
+        key, doc, events=[(topic_created, event.model_dump(), {"type": event.type, "event_id": event.event_id})]
+    )
 
     return doc
 
@@ -0,0 +1,80 @@
+# apps/api/src/services/outbox_relay.py
+# Purpose: Deliver events staged by the transactional outbox (see repos/firestore.py, OUTBOX).
+#   - Domain writes (stories, marketing assets) commit their events into {doc}/outbox/{event_id}
+#     in the same Firestore batch, so an event exists iff the write happened.
+#   - The relay pulls the oldest pending events across all outboxes (collection-group query),
+#     publishes them as one client batch, deletes the acked ones and counts failures.
+# Delivery is at-least-once (a crash between publish and delete re-sends); consumers dedupe
+# on the event_id attribute. The API runs the relay in a background thread (start_background,
+# wired in main.py; OUTBOX_RELAY_IN_API=false turns it off). Several instances may then
+# publish the same event once each, which the dedupe absorbs. Standalone / one-off drains:
+# scripts/outbox_relay.py.
+
+from __future__ import annotations
+
+import json
+import time
+import threading
+from typing import Optional, Tuple
+
+from ..core.config import get_settings
+from ..repos import pubsub, firestore as fs
+
+settings = get_settings()
+
+
+def drain_once(limit: int | None = None) -> Tuple[int, int]:
+    """Publish up to `limit` pending events. Returns (published, failed)."""
+    snaps = fs.pending_outbox(limit or settings.outbox_relay_batch_size)
+    if not snaps:
+        return 0, 0
+
+    messages = []
+    for snap in snaps:
+        doc = snap.to_dict() or {}
+        data = doc["data"]
+        if isinstance(data, str):          # staged before bodies were stored as bytes
+            data = data.encode("utf-8")
+        messages.append((doc["topic"], data, dict(doc.get("attrs") or {})))
+
+    errors = pubsub.publish_many(messages)
+    sent = [snap.reference for snap, err in zip(snaps, errors) if err is None]
+    failed = [(snap, f"{type(err).__name__}: {err}") for snap, err in zip(snaps, errors) if err is not None]
+    fs.settle_outbox(sent, failed, max_attempts=settings.outbox_max_attempts)
+    for snap, error in failed:
+        print(f"[outbox] publish failed for {snap.reference.path}: {error}")
+    return len(sent), len(failed)
+
+
+def run(interval: float | None = None, *, limit: int | None = None, once: bool = False,
+        stop: Optional[threading.Event] = None) -> None:
+    """
+    Drain until the outbox is empty, then poll every `interval` seconds. A full batch is
+    followed immediately by the next one; after failures (or a failed round) the relay
+    backs off one interval. Returns once `stop` is set.
+    """
+    interval = settings.outbox_relay_interval_seconds if interval is None else interval
+    limit = min(limit or settings.outbox_relay_batch_size, 500)   # one Firestore batch per round
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        started = time.monotonic()
+        try:
+            sent, failed = drain_once(limit)
+        except Exception as e:             # Firestore/Pub/Sub hiccup: try again next round
+            print(f"[outbox] relay round failed: {e}")
+            sent, failed = 0, 1
+        if sent or failed:
+            print(json.dumps({"outbox": {"published": sent, "failed": failed,
+                                         "ms": round((time.monotonic() - started) * 1000)}}))
+        if sent + failed == limit and not failed:
+            continue
+        if once:
+            return
+        stop.wait(interval)
+
+
+def start_background() -> threading.Event:
+    """Run the relay on a daemon thread; set the returned event to stop it."""
+    stop = threading.Event()
+    threading.Thread(target=run, kwargs={"stop": stop}, name="outbox-relay", daemon=True).start()
+    return stop
@@ -31,18 +31,20 @@ def marketing_post(
     mode=sync  → generate caption now (mock in Firebase-only; Gemini when enabled)
     mode=event → publish 'marketing.asset.requested' for worker to process later
     """
-    prod = fs.get_product(product_id)
-    if not prod:
-        return {"ok": False, "error": "product not found"}
-
     if mode == "event":
+        # the worker loads the product itself; only confirm it exists
+        if not fs.product_exists(product_id):
+            return {"ok": False, "error": "product not found"}
         op = request_marketing(
             MarketingRequest(product_id=product_id, lang=lang, channel=channel, extra_tags=extra_tags or []),
             actor={"via": "api", "role": "artisan"},
         )
         return {"ok": True, "queued": True, "op_id": op, "mode": "event"}
 
-    # mode == "sync"
+    # mode == "sync" (needs the product body for the caption)
+    prod = fs.get_product(product_id)
+    if not prod:
+        return {"ok": False, "error": "product not found"}
     doc = create_post(prod, lang, channel, extra_tags)
     return {"ok": True, "doc": doc, "mode": "sync"}
 
@@ -0,0 +1,182 @@
+# apps/api/src/v1/endpoints/media.py
+# Purpose: Serve locally stored media (FIREBASE_ONLY / on-prem) so PUBLIC_URL_PREFIX URLs
+#          resolve without a separate web server.
+# Routes:
+#   GET|HEAD /static/{path}  → file under UPLOAD_LOCAL_ROOT (Range, ETag/304; immutable caching
+#                              for unique object names, revalidation for everything else)
+#                              ?expires=&sig= required when LOCAL_REQUIRE_SIGNED=true
+#
+# Body transfer prefers the ASGI zero-copy extensions when the server advertises them
+# ("http.response.zerocopysend" → os.sendfile, "http.response.pathsend"); otherwise the
+# file is streamed in chunks read on the threadpool.
+
+from __future__ import annotations
+
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from ...repos import local_store, storage
+
+router = APIRouter(prefix="/static", tags=["media"])
+
+CHUNK_SIZE = 256 * 1024
+# Content-addressed (media/sha256/) and uuid-named (uploads/) objects never change under
+# their name. Others are rewritten in place (e.g. content/{pid}_{lang}.md): revalidate by ETag.
+IMMUTABLE_PREFIXES = (storage.CAS_PREFIX + "/", "uploads/")
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDATE = "no-cache"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# ------------------------------ helpers ---------------------------------
+def _resolve(path: str) -> Path:
+    """Map a URL path to its (sharded or legacy flat) file; rejects '..' and dot/temp files."""
+    full = local_store.resolve(path)
+    if full is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "not found")
+    return full
+
+
+def _http_date(ts: float) -> str:
+    return formatdate(ts, usegmt=True)
+
+
+def _etag(st: os.stat_result) -> str:
+    """Strong validator from file metadata (files are replaced atomically, never edited in place)."""
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}-{st.st_ino:x}"'
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single byte range → (start, end) inclusive. Returns None to fall back to a full 200
+    (absent/multi-range/malformed); raises 416 when the range is unsatisfiable.
+    """
+    m = _RANGE_RE.match(header.strip())
+    if not m:
+        return None
+    first, last = m.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":                      # suffix: last N bytes
+        n = int(last)
+        if n == 0:
+            raise HTTPException(status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                                headers={"Content-Range": f"bytes */{size}"})
+        return max(0, size - n), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+class LocalFileResponse(Response):
+    """
+    Minimal ASGI response for one (possibly partial) file body. Kept separate from
+    starlette's FileResponse so the zero-copy path can hand the fd + offset/count to
+    the server instead of copying chunks through Python.
+    """
+
+    def __init__(self, full: Path, status_code: int, headers: dict, offset: int, count: int, head: bool):
+        self.full = full
+        self.status_code = status_code
+        self.raw_headers = [(k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in headers.items()]
+        self.offset = offset
+        self.count = count
+        self.head = head
+        self.background = None   # no BackgroundTasks on this route
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.head or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.full, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.offset,
+                    "count": self.count,
+                })
+            return
+        if "http.response.pathsend" in extensions and self.status_code == status.HTTP_200_OK:
+            await send({"type": "http.response.pathsend", "path": str(self.full)})
+            return
+
+        # Fallback (e.g. uvicorn, which implements neither extension): chunked reads off-loop
+        f = await run_in_threadpool(open, self.full, "rb")
+        try:
+            await run_in_threadpool(f.seek, self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await run_in_threadpool(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:   # file shrank underneath us; close the body cleanly
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            await run_in_threadpool(f.close)
+
+
+# ------------------------------- Static media ------------------------------
+@router.api_route("/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_static(path: str, request: Request):
+    if local_store.REQUIRE_SIGNED and not local_store.verify(
+        path, request.query_params.get("expires"), request.query_params.get("sig"), request.method,
+    ):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "invalid or expired signature")
+    full = await run_in_threadpool(_resolve, path)
+    try:
+        st = await run_in_threadpool(os.stat, full)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "not found")
+
+    etag = _etag(st)
+    ctype = mimetypes.guess_type(full.name)[0] or "application/octet-stream"
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_IMMUTABLE if path.startswith(IMMUTABLE_PREFIXES) else CACHE_REVALIDATE,
+        "Accept-Ranges": "bytes",
+        "Last-Modified": _http_date(st.st_mtime),
+        "Content-Type": ctype,
+        "X-Content-Type-Options": "nosniff",
+    }
+
+    inm = request.headers.get("if-none-match")
+    if inm and (inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]):
+        return LocalFileResponse(full, status.HTTP_304_NOT_MODIFIED,
+                                 {k: v for k, v in headers.items() if k != "Content-Type"}, 0, 0, True)
+
+    size = st.st_size
+    rng = None
+    range_header = request.headers.get("range")
+    if range_header and size > 0:
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range.strip() == etag:
+            rng = _parse_range(range_header, size)
+
+    head = request.method == "HEAD"
+    if rng is None:
+        headers["Content-Length"] = str(size)
+        return LocalFileResponse(full, status.HTTP_200_OK, headers, 0, size, head)
+
+    start, end = rng
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return LocalFileResponse(full, status.HTTP_206_PARTIAL_CONTENT, headers, start, end - start + 1, head)
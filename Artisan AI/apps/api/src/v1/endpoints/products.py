@@ -2,18 +2,21 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Optional, Tuple, Literal, Dict, Any
+from typing import Optional, Tuple, Literal, Dict, Any, Iterator
 import os
-from fastapi import APIRouter, Body, Query, HTTPException, status
+from fastapi import APIRouter, Body, Query, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
-import base64, mimetypes, uuid
+from starlette.concurrency import run_in_threadpool
+import io, json, tempfile, uuid, zlib
 
-from ...models.product import Product, GenerateRequest
+from ...models.product import Product, GenerateRequest, BulkPatchRequest
 # NEW: import quick-text models
 from ...models.product import QuickTextRequest, QuickTextResponse  # <-- add these
 from ...repos import firestore as fs
 from ...repos import storage
 from ...services.content_service import request_generation, generate_story_sync
+from ...services import catalog_import
 # NEW: import the template helpers
 from ...services.text_templates import compose_short_description, compose_quick_history
 
@@ -45,6 +48,18 @@ def _parse_ts(s: Optional[str]) -> Optional[datetime]:
     return dt
 
 
+def _reject_inline_images(data: Dict[str, Any]) -> None:
+    """Inline base64 images are no longer ingested from JSON bodies."""
+    imgs = data.get("images") or []
+    if isinstance(imgs, str):
+        imgs = [imgs]
+    if any(isinstance(u, str) and u.startswith("data:") for u in imgs):
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            "images must be object references; upload files via POST /v1/uploads/images first",
+        )
+
+
 def _normalize_images(data: Dict[str, Any]) -> None:
     imgs = data.get("images")
     if imgs is None:
@@ -117,33 +132,14 @@ def _coerce_placeholders_to_urls(data: Dict[str, Any]) -> None:
 )
 def upsert_product(product_id: str, body: dict = Body(..., embed=False)):
     """
-    Accept raw dict to keep URLs as plain strings. If an image arrives as a base64
-    data URI, store it and replace with a short URL before validating with Product.
-    This avoids Pydantic Url errors and keeps Firestore clean.
+    Accept raw dict to keep URLs as plain strings. Images must be object references
+    (URLs or bucket paths): upload files first via POST /v1/uploads/images or a signed
+    PUT, then send the returned URL. This avoids Pydantic Url errors and keeps Firestore clean.
     """
     try:
         # Work on a mutable copy
         data: Dict[str, Any] = dict(body) if isinstance(body, dict) else {}
-
-        # --- Ingest any data:image/...;base64,... into storage -> URL ---
-        imgs = data.get("images") or []
-        if isinstance(imgs, (tuple, set)):
-            imgs = list(imgs)
-
-        processed: list[str] = []
-        for u in imgs:
-            if isinstance(u, str) and u.startswith("data:image/"):
-                header, b64 = u.split(",", 1)
-                ctype = header.split(";")[0].split(":")[1]        # e.g. image/png
-                ext = (mimetypes.guess_extension(ctype) or ".jpg").lstrip(".")
-                path = f"products/{product_id}/{uuid.uuid4().hex}.{ext}"
-                raw = base64.b64decode(b64)
-                url = storage.write_bytes(path, raw, content_type=ctype)  # http(s)://...
-                processed.append(url)
-            elif u:
-                processed.append(str(u))
-        if processed:
-            data["images"] = processed
+        _reject_inline_images(data)
 
         # Normalize + upgrade placeholders to absolute URLs
         _normalize_images(data)
@@ -182,11 +178,11 @@ def upsert_product_put(product_id: str, body: dict = Body(..., embed=False)):
 )
 def update_product(product_id: str, patch: dict = Body(..., embed=False)):
     try:
-        if not fs.get_product(product_id):
-            raise HTTPException(status.HTTP_404_NOT_FOUND, "product not found")
+        _reject_inline_images(patch)
         _normalize_images(patch)
         _coerce_placeholders_to_urls(patch)
-        fs.update_product_fields(product_id, patch)
+        if not fs.update_product_fields(product_id, patch, must_exist=True):
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "product not found")
         return {"ok": True, "product_id": product_id, "patched": patch}
     except HTTPException:
         raise
@@ -194,6 +190,54 @@ def update_product(product_id: str, patch: dict = Body(..., embed=False)):
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"firestore: {e}")
 
 
+# ------------------------- Bulk partial update ---------------------------
+_IMMUTABLE_FIELDS = ("id", "created_at")
+
+
+def _clean_patch(patch: Dict[str, Any]) -> Dict[str, Any]:
+    out = {k: v for k, v in (patch or {}).items() if k not in _IMMUTABLE_FIELDS}
+    _reject_inline_images(out)
+    _normalize_images(out)
+    _coerce_placeholders_to_urls(out)
+    return out
+
+
+@router.post(":batchUpdate", status_code=status.HTTP_200_OK)
+def batch_update_products(req: BulkPatchRequest = Body(...)):
+    """
+    Mass PATCH (price changes, soft-deletes, re-tagging) as batched commits of ≤500 writes.
+    - {"items": [{"id": "...", "patch": {...}}, ...]}   → per-id patches (missing ids reported)
+    - {"filter": {...}, "patch": {...}}                  → one patch applied to every match
+    Returns per-item results: {"ok", "updated", "failed", "items": [{"id", "ok", "error"?}]}
+    """
+    if bool(req.items) == bool(req.filter):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "send either `items` or `filter` + `patch`")
+    try:
+        if req.items:
+            updates = [(it.id, _clean_patch(it.patch)) for it in req.items]
+            written = iter(fs.batch_update_products([(pid, p) for pid, p in updates if p]))
+            # batch results come back in input order; slot the empty patches back in between
+            results = [next(written) if p else {"id": pid, "ok": False, "error": "empty patch"}
+                       for pid, p in updates]
+        else:
+            flt = req.filter.model_dump(exclude_none=True)
+            patch = _clean_patch(req.patch or {})
+            if not flt:
+                raise HTTPException(status.HTTP_400_BAD_REQUEST, "filter needs at least one field")
+            if not patch:
+                raise HTTPException(status.HTTP_400_BAD_REQUEST, "patch is empty")
+            ids = list(fs.iter_product_ids(**flt))
+            # matches come straight from the query, so skip the existence read
+            results = fs.batch_update_products([(pid, patch) for pid in ids], check_exists=False)
+
+        updated = sum(1 for r in results if r["ok"])
+        return {"ok": True, "updated": updated, "failed": len(results) - updated, "items": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"firestore: {e}")
+
+
 # ------------------------------- Read single -----------------------------
 @router.get("/{product_id}", status_code=status.HTTP_200_OK)
 def get_product(product_id: str):
@@ -242,13 +286,108 @@ def list_products(
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"firestore: {e}")
 
 
+# ------------------------- Catalog export (NDJSON) -----------------------
+_EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _json_default(v: Any) -> Any:
+    if hasattr(v, "isoformat"):
+        return v.isoformat()
+    return str(v)
+
+
+def _ndjson_chunks(docs: Iterator[Dict[str, Any]], gzip: bool) -> Iterator[bytes]:
+    """
+    Serialize docs one line each, coalesced into ~64 KB chunks.
+    Starlette pulls this sync iterator from a threadpool one chunk at a time and
+    awaits the socket between chunks, so a slow client throttles the Firestore reads.
+    """
+    z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip else None
+    buf = bytearray()
+    for doc in docs:
+        buf += json.dumps(doc, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        buf += b"\n"
+        if len(buf) >= _EXPORT_CHUNK_BYTES:
+            out = z.compress(bytes(buf)) if z else bytes(buf)
+            buf.clear()
+            if out:
+                yield out
+    tail = (z.compress(bytes(buf)) + z.flush()) if z else bytes(buf)
+    if tail:
+        yield tail
+
+
+@router.get(":export", status_code=status.HTTP_200_OK)
+def export_products(
+    request: Request,
+    category: Optional[str] = Query(None, description="Filter by category"),
+    active: Optional[bool] = Query(None, description="Filter by is_active (omit for all)"),
+    gzip: Optional[bool] = Query(None, description="Force gzip on/off (default: Accept-Encoding)"),
+):
+    """
+    Stream the whole catalog as NDJSON (one product per line) in a single request.
+    """
+    if gzip is None:
+        gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+
+    headers = {
+        "Content-Disposition": 'attachment; filename="products.ndjson"',
+        "Cache-Control": "no-store",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    docs = fs.iter_products(category=category, is_active=active)
+    return StreamingResponse(
+        _ndjson_chunks(docs, gzip),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+
+# ------------------------- Catalog import (bulk) -------------------------
+_IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+@router.post(":import", status_code=status.HTTP_200_OK)
+async def import_products(
+    request: Request,
+    format: Optional[Literal["jsonl", "csv"]] = Query(None, description="Default: from Content-Type"),
+    job_id: Optional[str] = Query(None, description="Re-send with the same job_id to resume"),
+):
+    """
+    Bulk upsert from a JSONL or CSV request body (one product per row, `id` required).
+    The body is streamed to a spooled temp file (RAM up to 8 MB, then disk) and the
+    import runs on a worker thread. Returns counts + per-row errors.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "jsonl")
+    job = job_id or uuid.uuid4().hex
+
+    spool = tempfile.SpooledTemporaryFile(max_size=_IMPORT_SPOOL_BYTES)
+    try:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        text = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        return await run_in_threadpool(
+            catalog_import.import_products,
+            catalog_import.iter_rows(text, fmt),
+            job_id=job,
+        )
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"import {job}: {e}")
+    finally:
+        spool.close()
+
+
 # --------------------------- Popularity counter --------------------------
 @router.post("/{product_id}/popularity", status_code=status.HTTP_200_OK)
 def bump_popularity(product_id: str, delta: int = Query(1)):
     try:
-        if not fs.get_product(product_id):
-            raise HTTPException(status.HTTP_404_NOT_FOUND, "product not found")
         new_val = fs.bump_popularity(product_id, delta=delta)
+        if new_val is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "product not found")
         return {"ok": True, "product_id": product_id, "popularity": new_val}
     except HTTPException:
         raise
@@ -262,6 +401,7 @@ def generate_content(
     product_id: str,
     req: GenerateRequest = Body(...),
     mode: Literal["sync", "event"] = Query("sync"),
+    priority: Literal["interactive", "bulk"] = Query("interactive", description="event mode: worker lane"),
 ):
     try:
         prod = fs.get_product(product_id)
@@ -269,8 +409,8 @@ def generate_content(
             raise HTTPException(status.HTTP_404_NOT_FOUND, "product not found")
 
         if mode == "event":
-            msg_id = request_generation(product_id, req.langs, req.tone, actor={"via": "api"})
-            return {"ok": True, "published": msg_id, "mode": "event"}
+            msg_id = request_generation(product_id, req.langs, req.tone, actor={"via": "api"}, priority=priority)
+            return {"ok": True, "published": msg_id, "mode": "event", "priority": priority}
 
         pointers = generate_story_sync(product_id, prod, req.tone, req.langs)
         return {"ok": True, "items": pointers, "mode": "sync"}
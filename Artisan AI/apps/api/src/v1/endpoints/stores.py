@@ -0,0 +1,120 @@
+# apps/api/src/v1/endpoints/stores.py
+# Purpose: Public storefront (store profile + that artisan's catalog).
+# Routes:
+#   GET  /v1/stores/{store_id}?limit=24&cursor_ts=...&cursor_id=...  → profile + stats + products page
+#
+# Store pages are the most shared links in marketing, so responses are kept in a
+# short-TTL in-process cache to absorb bursts; counters are precomputed on the store doc.
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException, Query, status
+from pydantic import ValidationError
+
+from ...core.config import get_settings
+from ...models.store import StoreProfile
+from ...repos import firestore as fs
+from .products import _parse_ts
+
+router = APIRouter(prefix="/v1/stores", tags=["stores"])
+
+_settings = get_settings()
+_cache: TTLCache = TTLCache(
+    maxsize=_settings.store_cache_max_entries,
+    ttl=_settings.store_cache_ttl_seconds,
+)
+_cache_lock = threading.Lock()
+
+
+# ------------------------------ helpers ---------------------------------
+def _iso(v: Any) -> Any:
+    return v.isoformat() if hasattr(v, "isoformat") else v
+
+
+def _profile(store_id: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate the stored doc as a StoreProfile (timestamps → ISO strings)."""
+    data = {k: v for k, v in doc.items() if k != "stats"}
+    data["id"] = store_id
+    for k in ("created_at", "updated_at"):
+        if data.get(k) is not None:
+            data[k] = _iso(data[k])
+    return StoreProfile.model_validate(data).model_dump(mode="json")
+
+
+def _stats(store_id: str, artisan_id: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Use the precomputed counters unless they are missing or older than the max age."""
+    stats = dict(doc.get("stats") or {})
+    computed_at = stats.pop("computed_at", None)
+    if isinstance(computed_at, datetime):
+        age = (datetime.now(timezone.utc) - computed_at).total_seconds()
+        if age < _settings.store_stats_max_age_seconds:
+            return stats
+    return fs.refresh_store_stats(store_id, artisan_id)
+
+
+def _storefront(
+    store_id: str,
+    limit: int,
+    cursor: Optional[Tuple[datetime, str]],
+    include_inactive: bool,
+) -> Optional[Dict[str, Any]]:
+    doc = fs.get_store(store_id)
+    if not doc:
+        return None
+
+    # products are keyed by the owning artisan (users/{id}); fall back to the store id
+    artisan_id = doc.get("owner_user_id") or store_id
+    page = fs.list_products_by_artisan(
+        artisan_id,
+        limit=limit,
+        cursor=cursor,
+        include_inactive=include_inactive,
+    )
+    nxt = page.get("next")
+    return {
+        "ok": True,
+        "store": _profile(store_id, doc),
+        "stats": _stats(store_id, artisan_id, doc),
+        "items": page["items"],
+        "next": {"ts": _iso(nxt[0]), "id": nxt[1]} if nxt else None,
+    }
+
+
+# ------------------------------- Storefront ------------------------------
+@router.get("/{store_id}", status_code=status.HTTP_200_OK)
+def get_storefront(
+    store_id: str,
+    limit: int = Query(24, ge=1, le=100),
+    cursor_ts: Optional[str] = Query(None, description="ISO ts from previous next.ts"),
+    cursor_id: Optional[str] = Query(None, description="Doc id from previous next.id"),
+    include_inactive: bool = Query(False, description="Include soft-deleted items"),
+):
+    try:
+        ts_parsed = _parse_ts(cursor_ts) if cursor_ts else None
+        cursor: Optional[Tuple[datetime, str]] = (
+            (ts_parsed, cursor_id) if (ts_parsed and cursor_id) else None
+        )
+        key = (store_id, limit, cursor, include_inactive)
+        with _cache_lock:
+            hit = _cache.get(key)
+        if hit is not None:
+            return hit
+
+        out = _storefront(store_id, limit, cursor, include_inactive)
+        if out is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "store not found")
+
+        with _cache_lock:
+            _cache[key] = out
+        return out
+    except ValidationError as ve:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(ve))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"firestore: {e}")
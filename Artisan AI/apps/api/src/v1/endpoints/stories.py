@@ -6,18 +6,32 @@
 # apps/api/src/v1/endpoints/stories.py
 # Purpose: Read story versions per product/lang (MVP read-only).
 # Routes:
-#   GET  /v1/stories?product_id=SH001&lang=hi  → list (filtered)
-#   GET  /v1/stories/{product_id}/{lang}       → get one
+#   GET  /v1/stories?product_id=SH001&lang=hi          → list (filtered)
+#   GET  /v1/stories/{product_id}/{lang}               → get one
+#   GET  /v1/stories/{product_id}/{lang}/content       → rendered, sanitized HTML (ETag/304)
 
 from __future__ import annotations
 
+import hashlib
+import threading
 from typing import Optional
-from fastapi import APIRouter, Query
-from ...repos import firestore as fs
-from google.cloud import firestore as gcf
+
+from cachetools import LRUCache
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from ...core.config import get_settings
+from ...repos import firestore as fs, storage
+from ...services import markdown_html
 
 router = APIRouter(prefix="/v1/stories", tags=["stories"])
 
+_settings = get_settings()
+# rendered HTML keyed by what identifies one stored revision of the markdown
+_html_cache: LRUCache = LRUCache(maxsize=_settings.story_html_cache_entries)
+_html_lock = threading.Lock()
+
 # LIST (optionally filter by product_id, lang)
 @router.get("")
 def list_stories(
@@ -36,12 +50,71 @@ def list_stories(
 # GET one by composite key {product_id}_{lang}
 @router.get("/{product_id}/{lang}")
 def get_story(product_id: str, lang: str):
-    doc_id = f"{product_id}_{lang}"
-    # direct read (simple; keeps repo changes optional for MVP)
-    db = gcf.Client()
-    snap = db.collection("stories").document(doc_id).get()
-    if not snap.exists:
+    data = fs.get_story(product_id, lang)
+    if not data:
         return {"ok": False, "error": "story not found"}
-    data = snap.to_dict()
-    data["id"] = doc_id
     return {"ok": True, "story": data}
+
+
+def _revision_key(story: dict) -> tuple:
+    """
+    (gcs_uri, version, revision). version alone stays 1 across regenerations, so the
+    content hash (or updated_at for older docs) tells revisions of the same object apart.
+    """
+    rev = story.get("content_sha256") or story.get("updated_at")
+    rev = rev.isoformat() if hasattr(rev, "isoformat") else str(rev or "")
+    return (story.get("gcs_uri"), int(story.get("version") or 1), rev)
+
+
+def _etag(key: tuple) -> str:
+    raw = "|".join(map(str, key)) + "|" + markdown_html.RENDER_VERSION
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def _render(gcs_uri: str) -> str:
+    return markdown_html.render(storage.read_text(gcs_uri))
+
+
+# Rendered content (server-side Markdown → sanitized HTML)
+@router.get("/{product_id}/{lang}/content")
+async def get_story_content(
+    product_id: str,
+    lang: str,
+    request: Request,
+    format: str = Query("json", pattern="^(json|html)$"),
+):
+    """
+    Hot stories come from the in-process LRU; a matching If-None-Match costs one doc
+    read and returns 304 without touching storage.
+    """
+    try:
+        story = await run_in_threadpool(fs.get_story, product_id, lang)
+        if not story or not story.get("gcs_uri"):
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "story not found")
+
+        key = _revision_key(story)
+        etag = _etag(key)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}   # always revalidate; 304 is cheap
+        inm = request.headers.get("if-none-match")
+        if inm and etag in [t.strip() for t in inm.split(",")]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        with _html_lock:
+            html = _html_cache.get(key)
+        if html is None:
+            html = await run_in_threadpool(_render, story["gcs_uri"])
+            with _html_lock:
+                _html_cache[key] = html
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "story content not found")
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"stories: {e}")
+
+    if format == "html":
+        return HTMLResponse(html, headers=headers)
+    return JSONResponse(
+        {"ok": True, "id": story["id"], "lang": lang, "version": key[1], "html": html},
+        headers=headers,
+    )
@@ -1,11 +1,17 @@
 # apps/api/src/v1/endpoints/uploads.py
 from __future__ import annotations
 
-from fastapi import APIRouter, Body, Query, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Body, Query, HTTPException, Request, status
 from pydantic import BaseModel, Field
-from ...repos import storage
+from starlette.concurrency import run_in_threadpool
+
+from ...core.config import get_settings
+from ...repos import pubsub, storage
 
 router = APIRouter(prefix="/v1/uploads", tags=["uploads"])
+settings = get_settings()
 
 # ---- Schemas ----
 class SignRequest(BaseModel):
@@ -21,6 +27,24 @@ class SignResponse(BaseModel):
     public_url: str
     object_name: str
 
+class SignBatchRequest(BaseModel):
+    files: list[SignRequest] = Field(..., min_length=1, max_length=50)
+
+class SignBatchResponse(BaseModel):
+    items: list[SignResponse]
+
+class ImageUploadResponse(BaseModel):
+    object_name: str
+    public_url: str
+    content_type: str
+    size: int
+    sha256: str | None = None
+    deduplicated: bool = False
+
+class ImageClaimRequest(BaseModel):
+    sha256: str = Field(..., pattern=r"^[0-9a-fA-F]{64}$")
+    content_type: str = Field("image/jpeg", alias="contentType")
+
 # ---- POST (preferred) ----
 @router.post("/sign", response_model=SignResponse, status_code=status.HTTP_200_OK)
 def sign_upload(body: SignRequest = Body(...)):
@@ -30,6 +54,16 @@ def sign_upload(body: SignRequest = Body(...)):
     except Exception as e:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"sign: {e}")
 
+# ---- Batch: one round trip for a multi-photo upload ----
+@router.post("/sign:batch", response_model=SignBatchResponse, status_code=status.HTTP_200_OK)
+def sign_upload_batch(body: SignBatchRequest = Body(...)):
+    """Signs every file with the same signer; items are returned in request order."""
+    try:
+        items = storage.signed_put_urls([(f.filename, f.content_type) for f in body.files])
+        return {"items": items}
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"sign: {e}")
+
 # ---- GET (back-compat) ----
 @router.get("/signed-url", response_model=SignResponse)
 def get_signed_url(
@@ -40,6 +74,177 @@ def get_signed_url(
     return sign_upload(SignRequest(filename=filename, contentType=contentType))
 
 
+# Raster types only: anything else (image/svg+xml in particular) would later be served
+# from the API origin by /static and could carry script.
+IMAGE_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "image/gif": ".gif",
+}
+SNIFF_BYTES = 12
+
+
+def _image_ext(ctype: str) -> str:
+    ext = IMAGE_TYPES.get(ctype)
+    if ext is None:
+        raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            f"unsupported image type; use one of {', '.join(IMAGE_TYPES)}")
+    return ext
+
+
+def _sniff_image(head: bytes) -> Optional[str]:
+    """Image type from the file signature (first SNIFF_BYTES bytes), or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return "image/avif"
+    return None
+
+
+def _check_signature(head: bytes, ctype: str) -> None:
+    if _sniff_image(head) != ctype:
+        raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, f"body is not a valid {ctype} file")
+
+
+def _check_product_id(product_id: Optional[str]) -> None:
+    if product_id is not None and (not product_id or "/" in product_id):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "invalid product_id")
+
+
+def _announce(out: dict, product_id: Optional[str]) -> None:
+    """
+    Emit media.uploaded so the worker renders thumbnails / WebP / AVIF variants and
+    records them on the product. Best effort: the upload itself already succeeded.
+    Local (FIREBASE_ONLY) files are not reachable by the worker, so nothing is sent.
+    """
+    if storage.FIREBASE_ONLY:
+        return
+    envelope = {
+        "type": "media.uploaded",
+        "source": "api",
+        "data": {
+            "sha256": out["sha256"],
+            "object_name": out["object_name"],
+            "public_url": out["public_url"],
+            "content_type": out["content_type"],
+            "product_id": product_id,
+        },
+    }
+    try:
+        pubsub.publish_nowait(settings.pubsub_topic_media, envelope, attrs={"type": "media.uploaded"})
+    except Exception as e:
+        print(f"[uploads] media.uploaded publish failed for {out['object_name']}: {e}")
+
+
+# ---- Streaming image upload (no signed URL / FIREBASE_ONLY) ----
+@router.post("/images", response_model=ImageUploadResponse, status_code=status.HTTP_201_CREATED)
+async def upload_image(
+    request: Request,
+    product_id: Optional[str] = Query(None, description="Attach rendered variants to this product"),
+):
+    """
+    Raw image body (Content-Type: image/jpeg|png|webp|avif|gif; the bytes must match it),
+    e.g. fetch(url, {method: "POST", body: file}).
+    Chunks are hashed and spooled as they arrive; blocking writes run on the threadpool so
+    the event loop never waits on disk/GCS. Objects are content-addressed
+    (media/sha256/ab/<sha256>.<ext>): an image that is already stored is not written again.
+    Send the returned public_url in product.images; resized variants are rendered by the
+    worker and appear on the product as image_variants[sha256].
+    """
+    _check_product_id(product_id)
+    ctype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    ext = _image_ext(ctype)
+    limit = settings.upload_max_bytes
+    if int(request.headers.get("content-length") or 0) > limit:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, f"max {limit} bytes")
+
+    try:
+        writer = await run_in_threadpool(storage.open_writer, ctype, ext=ext)
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"upload: {e}")
+    head = b""   # buffered until the signature can be checked
+    try:
+        async for chunk in request.stream():
+            if not chunk:
+                continue
+            if writer.size + len(head or b"") + len(chunk) > limit:
+                raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, f"max {limit} bytes")
+            if head is not None:
+                head += chunk
+                if len(head) < SNIFF_BYTES:
+                    continue
+                _check_signature(head, ctype)
+                chunk, head = head, None
+            await run_in_threadpool(writer.write, chunk)
+        if head:   # body shorter than SNIFF_BYTES
+            _check_signature(head, ctype)
+            await run_in_threadpool(writer.write, head)
+        if writer.size == 0:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "empty body")
+        url = await run_in_threadpool(writer.commit)
+    except HTTPException:
+        await run_in_threadpool(writer.abort)
+        raise
+    except Exception as e:
+        await run_in_threadpool(writer.abort)
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"upload: {e}")
+
+    out = {
+        "object_name": writer.path,
+        "public_url": url,
+        "content_type": ctype,
+        "size": writer.size,
+        "sha256": writer.digest,
+        "deduplicated": writer.deduped,
+    }
+    _announce(out, product_id)   # non-blocking (batched publish)
+    return out
+
+
+# ---- Pre-upload check: reuse an image the store already has ----
+@router.post("/images/claim", response_model=ImageUploadResponse)
+def claim_image(
+    body: ImageClaimRequest = Body(...),
+    product_id: Optional[str] = Query(None, description="Attach rendered variants to this product"),
+):
+    """
+    Client hashed the file first (SHA-256). If that content is already stored, return its
+    URL — no upload needed. 404 → upload via POST /images.
+    """
+    _check_product_id(product_id)
+    digest = body.sha256.lower()
+    ctype = body.content_type.lower()
+    ext = _image_ext(ctype)   # 415 for anything but the raster allowlist
+    try:
+        url = storage.lookup_content(digest, ext)
+        if url is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "not stored")
+        meta = storage.content_meta(digest)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"upload: {e}")
+    out = {
+        "object_name": storage.content_path(digest, ext),
+        "public_url": url,
+        "content_type": meta.get("content_type") or ctype,
+        "size": int(meta.get("size") or 0),
+        "sha256": digest,
+        "deduplicated": True,
+    }
+    if product_id:
+        _announce(out, product_id)   # variants already exist → worker only links them
+    return out
+
+
 # # apps/api/src/v1/endpoints/uploads.py
 # from fastapi import APIRouter, Query
 # from ...repos.storage import signed_put_url
@@ -0,0 +1,36 @@
+# apps/api/tests/test_markdown_html.py
+from src.services.markdown_html import render
+
+
+def _link(href: str, label: str) -> str:
+    return f'<a href="{href}" rel="nofollow noopener" target="_blank">{label}</a>'
+
+
+def test_underscores_in_url_are_not_emphasis():
+    out = render("See [shop](https://ex.com/a_b_c) and _nice_")
+    assert out == f"<p>See {_link('https://ex.com/a_b_c', 'shop')} and <em>nice</em></p>"
+
+
+def test_double_underscore_in_url_is_not_strong():
+    assert render("[x](https://ex.com/__init__)") == f"<p>{_link('https://ex.com/__init__', 'x')}</p>"
+
+
+def test_asterisks_in_url_are_not_emphasis():
+    out = render("**bold** [a](https://ex.com/*x*) *it*")
+    assert out == f"<p><strong>bold</strong> {_link('https://ex.com/*x*', 'a')} <em>it</em></p>"
+
+
+def test_link_label_keeps_emphasis():
+    assert render("[**sale** now](https://ex.com/s)") == f"<p>{_link('https://ex.com/s', '<strong>sale</strong> now')}</p>"
+
+
+def test_emphasis_around_link():
+    assert render("_see [x](https://ex.com/a_b)_") == f"<p><em>see {_link('https://ex.com/a_b', 'x')}</em></p>"
+
+
+def test_code_span_is_left_alone():
+    assert render("`__init__` and _x_") == "<p><code>__init__</code> and <em>x</em></p>"
+
+
+def test_unsafe_link_is_dropped_and_html_escaped():
+    assert render("[<b>x</b>](javascript:alert)") == "<p>&lt;b&gt;x&lt;/b&gt;</p>"
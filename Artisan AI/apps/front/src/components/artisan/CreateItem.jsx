@@ -172,17 +172,34 @@ export default function CreateItem({ onClose, onCreate, mode = "page" }) {
     return body;
   }
 
-  async function uploadToGCS(file) {
-    const q = new URLSearchParams({ filename: file.name, contentType: file.type || "application/octet-stream" });
-    const meta = await jsonFetch(`/v1/uploads/signed-url?${q.toString()}`);
-    if (meta.upload_url) {
-      const put = await fetch(meta.upload_url, {
-        method: "PUT",
-        headers: { "Content-Type": file.type || "application/octet-stream" },
-        body: file,
-      });
-      if (!put.ok) throw new Error(`Upload failed: ${put.status} ${put.statusText}`);
+  async function sha256Hex(file) {
+    if (!window.crypto?.subtle) return null;
+    const buf = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+    return Array.from(new Uint8Array(buf), (b) => b.toString(16).padStart(2, "0")).join("");
+  }
+
+  // Streams the raw file to the API. Images are stored by content hash, so an already-stored
+  // image is claimed instead of re-sent; the worker then renders resized WebP/AVIF variants
+  // and attaches them to `productId` (as image_variants).
+  async function uploadViaApi(file, productId) {
+    const q = productId ? `?${new URLSearchParams({ product_id: productId })}` : "";
+    const digest = await sha256Hex(file).catch(() => null);
+    if (digest) {
+      try {
+        const hit = await jsonFetch(`/v1/uploads/images/claim${q}`, {
+          method: "POST",
+          body: JSON.stringify({ sha256: digest, contentType: file.type || "image/jpeg" }),
+        });
+        return hit.public_url;
+      } catch {
+        /* not stored yet → upload */
+      }
     }
+    const meta = await jsonFetch(`/v1/uploads/images${q}`, {
+      method: "POST",
+      headers: { "content-type": file.type || "image/jpeg" },
+      body: file,
+    });
     return meta.public_url;
   }
 
@@ -199,7 +216,7 @@ export default function CreateItem({ onClose, onCreate, mode = "page" }) {
     setErr("");
     try {
       setBusy(true);
-      const url = await uploadToGCS(f);
+      const url = await uploadViaApi(f, name.trim() ? slug(name) : undefined);
       setImageURL(url);
       setImageDataUrl("");
     } catch (error) {
@@ -291,8 +308,7 @@ export default function CreateItem({ onClose, onCreate, mode = "page" }) {
 
   function buildProductPayload({ id }) {   // Only send real image URLs (GCS) or data URLs. Never send the UI placeholder.
     const images = [];
-    if (imageURL) images.push(imageURL);                // https://storage.googleapis.com/...
-    else if (imageDataUrl?.startsWith("data:")) images.push(imageDataUrl); // backend will ingest
+    if (imageURL) images.push(imageURL);                // https://storage.googleapis.com/... (data: URLs are preview-only)
 
     return {
       id,
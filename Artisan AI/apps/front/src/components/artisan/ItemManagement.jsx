@@ -6,9 +6,11 @@ import SectionTitle from '../ui/SectionTitle'
 import Empty from '../ui/Empty'
 import { Card, CardContent, CardHeader, CardTitle } from '../ui/Card'
 import Badge from '../ui/Badge'
+import ProductImage from '../ui/ProductImage'
 import { Plus, Megaphone, Hash, Store } from 'lucide-react'
 import QuickMarketing from './QuickMarketing'
 import CreateItem from './CreateItem'
+import { variantSrcSets } from '../../lib/images'
 
 const BASE =
   import.meta.env.VITE_API_BASE ||
@@ -57,6 +59,7 @@ export default function ItemManagement() {
         theme: p.category || '—', // saved in `category`
         type: (Array.isArray(p.materials) && p.materials[0]) || p.attributes?.type || p.category || 'craft',
         preview: (Array.isArray(p.images) && p.images[0]) || p.preview_image || PLACEHOLDER,
+        sources: variantSrcSets(p, Array.isArray(p.images) && p.images[0]),
         inventory: p.inventory ?? null,
       }))
 
@@ -150,14 +153,12 @@ export default function ItemManagement() {
                   </CardHeader>
 
                   <CardContent className="space-y-3">
-                    <img
+                    <ProductImage
                       src={it.preview || PLACEHOLDER}
+                      sources={it.sources}
+                      fallback={PLACEHOLDER}
                       alt={`${it.name} preview`}
                       className="w-full h-40 object-cover rounded-xl border border-slate-700"
-                      onError={(e) => {
-                        e.currentTarget.onerror = null
-                        e.currentTarget.src = PLACEHOLDER
-                      }}
                     />
                     <div className="text-sm text-slate-400">{it.type}</div>
                     <div className="flex gap-2">
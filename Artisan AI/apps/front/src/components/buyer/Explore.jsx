@@ -3,7 +3,9 @@ import { useEffect, useMemo, useState } from 'react'
 import { Card, CardContent } from '../ui/Card'
 import Button from '../ui/Button'
 import Badge from '../ui/Badge'
+import ProductImage from '../ui/ProductImage'
 import { Filter, ShieldCheck } from 'lucide-react'
+import { variantSrcSets } from '../../lib/images'
 
 const BASE =
   import.meta.env.VITE_API_BASE ||
@@ -37,6 +39,7 @@ export default function Explore() {
           theme: p.category || '—',
           price: p.price ?? null,
           img: (Array.isArray(p.images) && p.images[0]) || PLACEHOLDER,
+          sources: variantSrcSets(p, Array.isArray(p.images) && p.images[0]),
         }))
         if (!cancelled) setItems(mapped)
       } catch (e) {
@@ -87,14 +90,12 @@ export default function Explore() {
         <div className="grid md:grid-cols-3 gap-4">
           {filtered.map((r) => (
             <div key={r.id || r.title} className="card overflow-hidden">
-              <img
+              <ProductImage
                 src={r.img}
+                sources={r.sources}
+                fallback={PLACEHOLDER}
                 className="w-full h-40 object-cover"
                 alt={r.title || 'Product'}
-                onError={(e) => {
-                  e.currentTarget.onerror = null;
-                  e.currentTarget.src = PLACEHOLDER;
-                }}
               />
               <div className="card-content space-y-2">
                 <div className="flex items-center justify-between">
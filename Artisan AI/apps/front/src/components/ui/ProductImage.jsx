@@ -0,0 +1,24 @@
+// front/src/components/ui/ProductImage.jsx
+/**
+ * <picture> with AVIF/WebP srcsets (from lib/images variantSrcSets) when the worker has
+ * rendered variants; the browser picks the smallest width that fills the card.
+ * Falls back to the original `src`.
+ */
+export default function ProductImage({ sources: sets, src, fallback, sizes = '(min-width: 768px) 33vw, 100vw', ...imgProps }) {
+  return (
+    <picture>
+      {sets?.avif ? <source type="image/avif" srcSet={sets.avif} sizes={sizes} /> : null}
+      {sets?.webp ? <source type="image/webp" srcSet={sets.webp} sizes={sizes} /> : null}
+      <img
+        src={src || fallback}
+        loading="lazy"
+        decoding="async"
+        {...imgProps}
+        onError={(e) => {
+          e.currentTarget.onerror = null
+          if (fallback) e.currentTarget.src = fallback
+        }}
+      />
+    </picture>
+  )
+}
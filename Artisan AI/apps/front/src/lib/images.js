@@ -0,0 +1,20 @@
+// front/src/lib/images.js
+// Responsive sources for product images. The worker renders resized WebP/AVIF variants
+// per uploaded image and stores them on the product as image_variants[sha256]:
+//   { width, height, webp: [{w, h, url}], avif: [{w, h, url}] }
+
+/** sha256 of a content-addressed image URL (…/media/sha256/ab/<sha>.<ext>), else null. */
+export function imageDigest(url) {
+  const m = /\/media\/sha256\/[0-9a-f]{2}\/([0-9a-f]{64})\.[a-z0-9]+$/i.exec(String(url || ''));
+  return m ? m[1].toLowerCase() : null;
+}
+
+/** { avif, webp } srcset strings for `url` on `product`, or null when no variants exist yet. */
+export function variantSrcSets(product, url) {
+  const digest = imageDigest(url);
+  const v = digest && product?.image_variants?.[digest];
+  if (!v) return null;
+  const srcset = (list) =>
+    Array.isArray(list) && list.length ? list.map((x) => `${x.url} ${x.w}w`).join(', ') : null;
+  return { avif: srcset(v.avif), webp: srcset(v.webp) };
+}
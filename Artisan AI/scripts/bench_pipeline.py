@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark publish → worker handling on one machine, with no Pub/Sub.
+
+Forces EVENT_BUS=memory: events published through the API's repos/pubsub land on
+in-process asyncio queues and are dispatched to the worker's handlers on a thread
+pool, decoded exactly as the worker would. The worker is loaded from apps/Worker/src as package `worker` (both apps
+are package `src`, so it can't be imported under its own name here). Firestore
+and GCS calls inside the handlers go wherever the usual env points — use the
+emulators for fully offline runs.
+
+Usage:
+  python scripts/bench_pipeline.py --events 500 --concurrency 8 --product p1
+  python scripts/bench_pipeline.py --type media.uploaded \
+      --data '{"sha256": "<hex>", "object_name": "media/sha256/ab/<hex>.jpg"}'
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+import types
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+os.environ["EVENT_BUS"] = "memory"
+
+# Make the API package importable (apps/api/src → `src`)
+sys.path.insert(0, str(ROOT / "apps" / "api"))
+
+from src.models.events import make_event  # noqa: E402
+from src.repos import eventbus, pubsub  # noqa: E402
+
+
+def _load_worker():
+    """Import apps/Worker/src/runner.py as worker.runner (relative imports resolve inside `worker`)."""
+    pkg = types.ModuleType("worker")
+    pkg.__path__ = [str(ROOT / "apps" / "Worker" / "src")]
+    sys.modules["worker"] = pkg
+    return importlib.import_module("worker.runner")
+
+
+def _publish_all(topic, event_type, data, n):
+    # fresh keys per run: a rerun within the idempotency TTL would otherwise only time dedupe
+    run_id = uuid.uuid4().hex[:8]
+    for i in range(n):
+        ev = make_event(event_type, data, source="script", idempotency_key=f"bench-{run_id}-{i}")
+        pubsub.publish(topic, ev.model_dump(), attrs={"type": event_type, "sent_at": repr(time.perf_counter())})
+
+
+def _pct(values, p):
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def run(args):
+    runner = _load_worker()
+    codec = importlib.import_module("worker.utils.codec")
+    data = json.loads(args.data) if args.data else {"product_id": args.product, "lang": "en", "channel": "instagram"}
+    topic = args.topic or args.type
+    queue = eventbus.get_bus().subscribe(topic)
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="bench-handler")
+
+    latencies, errors = [], []
+
+    async def handle(msg):
+        _, raw, attrs = msg
+        try:
+            await loop.run_in_executor(pool, lambda: runner.dispatch(codec.decode(raw, attrs)))
+        except Exception as e:
+            errors.append(e)
+        latencies.append(time.perf_counter() - float(attrs["sent_at"]))
+
+    started = time.perf_counter()
+    publisher = loop.run_in_executor(None, _publish_all, topic, args.type, data, args.events)
+    tasks = [asyncio.create_task(handle(await queue.get())) for _ in range(args.events)]
+    await publisher
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+
+    latencies.sort()
+    ms = lambda s: round(s * 1000, 2)  # noqa: E731
+    print(json.dumps({
+        "events": args.events,
+        "concurrency": args.concurrency,
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(args.events / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": ms(statistics.fmean(latencies)),
+            "p50": ms(_pct(latencies, 50)),
+            "p95": ms(_pct(latencies, 95)),
+            "p99": ms(_pct(latencies, 99)),
+            "max": ms(latencies[-1]),
+        },
+    }, indent=2))
+    if errors:
+        print(f"first error: {type(errors[0]).__name__}: {errors[0]}", file=sys.stderr)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--type", default="content.requested", help="event type (selects the worker handler)")
+    ap.add_argument("--topic", help="topic name (default: the event type)")
+    ap.add_argument("--data", help="event data as JSON (default: content.requested for --product)")
+    ap.add_argument("--product", default="p1", help="product id for the default payload")
+    ap.add_argument("--events", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=8, help="handler threads")
+    args = ap.parse_args()
+    if args.events < 1:
+        sys.exit("--events must be ≥ 1")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Bulk-import products from a JSONL or CSV file into Firestore.
+
+Rows are validated against ProductIn and written through a parallel BulkWriter
+(same code path as POST /v1/products:import). Progress is checkpointed in
+imports/{job_id}; re-running with the same --job-id resumes after the last
+checkpoint.
+
+Usage:
+  export GCP_PROJECT=<your-project>
+  python scripts/import_catalog.py catalog.jsonl --job-id coop-2025-10
+  python scripts/import_catalog.py catalog.csv --report errors.jsonl
+"""
+
+import argparse
+import json
+import sys
+import uuid
+from pathlib import Path
+
+# Make the API package importable (apps/api/src → `src`)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "apps" / "api"))
+
+from src.services import catalog_import  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", help="JSONL or CSV file")
+    ap.add_argument("--format", choices=["jsonl", "csv"], help="default: from file extension")
+    ap.add_argument("--job-id", help="checkpoint key (default: random)")
+    ap.add_argument("--checkpoint-every", type=int, default=None, help="rows between checkpoints")
+    ap.add_argument("--report", help="write per-row errors here (JSONL)")
+    args = ap.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+    job_id = args.job_id or f"cli-{uuid.uuid4().hex[:12]}"
+    print(f"Importing {args.path} ({fmt}) as job {job_id}…")
+
+    with open(args.path, encoding="utf-8-sig", newline="") as f:
+        out = catalog_import.import_products(
+            catalog_import.iter_rows(f, fmt),
+            job_id=job_id,
+            checkpoint_every=args.checkpoint_every,
+        )
+
+    errors = out.pop("errors")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as r:
+            for e in errors:
+                r.write(json.dumps(e, ensure_ascii=False) + "\n")
+    else:
+        for e in errors[:20]:
+            print(f"✗ row {e['row']} ({e['id']}): {e['error']}")
+        if len(errors) > 20:
+            print(f"… {len(errors) - 20} more (use --report)")
+
+    print(f"Done: written={out['written']} failed={out['failed']} skipped={out['skipped']}")
+    sys.exit(1 if out["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Relay events from Firestore outboxes to Pub/Sub.
+
+Domain writes (story saves, marketing assets) stage their events in an `outbox`
+subcollection in the same batch; the relay publishes them in bulk and deletes
+them once acked. The API already runs it in the background; use this script
+when that is off (OUTBOX_RELAY_IN_API=false) or to drain a backlog by hand.
+Needs the collection-group index on outbox (status, created_at) from
+firestore.indexes.json.
+
+Usage:
+  export GCP_PROJECT=<your-project>
+  python scripts/outbox_relay.py                 # run forever
+  python scripts/outbox_relay.py --once          # drain what is pending, then exit
+  python scripts/outbox_relay.py --interval 0.5 --batch-size 200
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Make the API package importable (apps/api/src → `src`)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "apps" / "api"))
+
+from src.core.config import get_settings  # noqa: E402
+from src.repos import pubsub  # noqa: E402
+from src.services import outbox_relay  # noqa: E402
+
+
+def main():
+    settings = get_settings()
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--once", action="store_true", help="exit when the outbox is empty")
+    ap.add_argument("--interval", type=float, default=settings.outbox_relay_interval_seconds,
+                    help="seconds between polls when idle")
+    ap.add_argument("--batch-size", type=int, default=settings.outbox_relay_batch_size,
+                    help="events published per round (≤ 500, the Firestore batch limit)")
+    args = ap.parse_args()
+
+    try:
+        outbox_relay.run(args.interval, limit=max(1, args.batch_size), once=args.once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pubsub.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Re-store existing text artifacts (story markdown, marketing JSON) in GCS with
+Content-Encoding: gzip, the format new writes already use.
+
+Only objects without a Content-Encoding and with a text-like content type are
+touched. Content type and custom metadata are preserved, a sha256 of the plain
+bytes is recorded (used by the API's skip-unchanged writes), and each rewrite
+is conditional on the generation that was read, so a concurrent writer always
+wins.
+
+Usage:
+  export GCP_PROJECT=<your-project> GCS_BUCKET=<bucket>
+  python scripts/recompress_objects.py --dry-run
+  python scripts/recompress_objects.py --prefix content/ --prefix marketing/
+"""
+
+import argparse
+import hashlib
+import sys
+from pathlib import Path
+
+# Make the API package importable (apps/api/src → `src`)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "apps" / "api"))
+
+from google.api_core.exceptions import PreconditionFailed  # noqa: E402
+
+from src.repos import storage  # noqa: E402
+
+TEXT_TYPES = ("text/", "application/json")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--prefix", action="append", help="object prefix (repeatable; default: content/ and marketing/)")
+    ap.add_argument("--min-bytes", type=int, default=storage.GZIP_MIN_BYTES, help="skip smaller objects")
+    ap.add_argument("--dry-run", action="store_true", help="report savings without rewriting")
+    args = ap.parse_args()
+
+    if storage.FIREBASE_ONLY:
+        sys.exit("FIREBASE_ONLY is set: nothing is stored in GCS")
+    storage._ensure_gcs()
+    bucket = storage._bucket
+
+    seen = rewritten = skipped = 0
+    before = after = 0
+    for prefix in args.prefix or ["content/", "marketing/"]:
+        for blob in bucket.list_blobs(prefix=prefix):
+            seen += 1
+            ctype = blob.content_type or ""
+            if blob.content_encoding or not ctype.startswith(TEXT_TYPES) or (blob.size or 0) < args.min_bytes:
+                skipped += 1
+                continue
+
+            plain = blob.download_as_bytes(if_generation_match=blob.generation)
+            packed = storage.gzip_bytes(plain)
+            if len(packed) >= len(plain):
+                skipped += 1
+                continue
+            before += len(plain)
+            after += len(packed)
+            if args.dry_run:
+                print(f"would compress {blob.name}: {len(plain)} → {len(packed)} bytes")
+                continue
+
+            out = bucket.blob(blob.name)
+            out.content_encoding = "gzip"
+            out.cache_control = blob.cache_control
+            out.metadata = {**(blob.metadata or {}), "sha256": hashlib.sha256(plain).hexdigest()}
+            try:
+                out.upload_from_string(packed, content_type=ctype, if_generation_match=blob.generation)
+                rewritten += 1
+            except PreconditionFailed:
+                print(f"changed during rewrite, left as is: {blob.name}")
+                skipped += 1
+
+    ratio = f" ({before / after:.1f}×)" if after else ""
+    verb = "would save" if args.dry_run else "saved"
+    print(f"Done: seen={seen} rewritten={rewritten} skipped={skipped}; {verb} {before - after} bytes{ratio}")
+
+
+if __name__ == "__main__":
+    main()